@@ -0,0 +1,219 @@
+from string import Formatter
+from threading import Lock, Thread, Timer
+import json
+import logging
+import os
+
+from minilodon import util
+
+class Template(object):
+    '''An action message parsed once into literal and field segments.
+
+    Only the `victim` and `nick` fields are allowed; unknown fields raise
+    KeyError and malformed braces raise ValueError when compiling.
+    '''
+    fields = ('victim', 'nick')
+
+    def __init__(self, source):
+        self.source = source
+        self.segments = []
+        for literal, field, spec, conversion in Formatter().parse(source):
+            if field is None:
+                self.segments.append((literal, None, None))
+                continue
+            if field not in self.fields:
+                raise KeyError(field)
+            if spec or conversion:
+                fmt = '{0' + ('!' + conversion if conversion else '') + \
+                      (':' + spec if spec else '') + '}'
+                fmt.format('')
+            else:
+                fmt = None
+            self.segments.append((literal, field, fmt))
+
+    def render(self, victim, nick):
+        values = {'victim': victim, 'nick': nick}
+        parts = []
+        for literal, field, fmt in self.segments:
+            parts.append(literal)
+            if field is not None:
+                value = values[field]
+                parts.append(value if fmt is None else fmt.format(value))
+        return ''.join(parts)
+
+class ActionStore(object):
+    '''Keeps the action categories in memory and writes them back lazily.
+
+    Changes are saved `delay` seconds after the last edit, so a run of edits
+    results in a single write. The file is replaced atomically by writing a
+    temporary file and renaming it over the original.
+    '''
+    def __init__(self, filename, delay=1.0):
+        self.filename = filename
+        self.delay = delay
+        self.actions = {}
+        self.templates = {}
+        self.lock = Lock()
+        self.timer = None
+        self.logger = logging.getLogger(__name__)
+
+    def __contains__(self, category):
+        return category in self.actions
+
+    def __iter__(self):
+        return iter(list(self.actions))
+
+    def load(self):
+        with open(self.filename) as actions_file:
+            actions = json.load(actions_file)
+        templates = {}
+        for category in actions:
+            templates[category] = {}
+            for key, msg in actions[category].items():
+                try:
+                    templates[category][key] = Template(msg)
+                except (KeyError, ValueError) as error:
+                    self.logger.warning("Skipping action %s %s: %s",
+                                        category, key, error)
+        with self.lock:
+            self.actions = actions
+            self.templates = templates
+
+    def get(self, category, key):
+        return self.actions.get(category, {}).get(key)
+
+    def template(self, category, key):
+        return self.templates.get(category, {}).get(key)
+
+    def keys(self, category):
+        return sorted(self.actions.get(category, {}))
+
+    def set(self, category, key, msg):
+        change = ['set', category, key, msg]
+        with self.lock:
+            created = category not in self.actions
+            self.apply(change)
+        self.changed(change)
+        return created
+
+    def delete(self, category, key):
+        change = ['delete', category, key]
+        with self.lock:
+            self.apply(change)
+        self.changed(change)
+
+    def apply(self, change):
+        if change[0] == 'set':
+            template = Template(change[3])
+            self.actions.setdefault(change[1], {})[change[2]] = change[3]
+            self.templates.setdefault(change[1], {})[change[2]] = template
+        elif change[0] == 'delete':
+            self.actions.get(change[1], {}).pop(change[2], None)
+            self.templates.get(change[1], {}).pop(change[2], None)
+
+    def changed(self, change):
+        self.schedule_save()
+
+    def schedule_save(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = Timer(self.delay, self.save)
+            self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            timer, self.timer = self.timer, None
+        if timer is not None:
+            timer.cancel()
+            self.save()
+
+    def save(self):
+        with self.lock:
+            data = self.dump()
+        self.write(data)
+
+    def dump(self):
+        return json.dumps(self.actions, indent=2, separators=(',', ': '),
+                          sort_keys=True)
+
+    def write(self, data):
+        util.write_atomic(self.filename, data)
+
+class JournalActionStore(ActionStore):
+    '''Action store that appends every edit to a journal file.
+
+    The snapshot in `filename` is only rewritten by compaction, which runs in
+    a background thread once the journal grows past `ratio` times the size of
+    the snapshot. The journal is renamed before compacting, so after a crash
+    at any point replaying snapshot, renamed journal and journal in that
+    order restores every completed edit. A torn last record is ignored.
+    '''
+    def __init__(self, filename, ratio=1.0, minsize=65536):
+        ActionStore.__init__(self, filename)
+        self.journalname = filename + '.journal'
+        self.compactname = filename + '.compact'
+        self.ratio = ratio
+        self.minsize = minsize
+        self.snapshotsize = 0
+        self.journal = None
+        self.compactor = None
+
+    def load(self):
+        if os.path.exists(self.filename):
+            ActionStore.load(self)
+            self.snapshotsize = os.path.getsize(self.filename)
+        if os.path.exists(self.compactname):
+            self.replay(self.compactname)
+        if os.path.exists(self.journalname):
+            size = self.replay(self.journalname)
+            os.truncate(self.journalname, size)
+        if os.path.exists(self.compactname):
+            self.write(self.dump())
+            os.remove(self.compactname)
+        self.journal = open(self.journalname, 'a')
+
+    def replay(self, name):
+        size = 0
+        with open(name, 'rb') as journal:
+            for line in journal:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    change = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                with self.lock:
+                    self.apply(change)
+                size += len(line)
+        return size
+
+    def changed(self, change):
+        with self.lock:
+            self.journal.write(json.dumps(change) + '\n')
+            self.journal.flush()
+            size = self.journal.tell()
+        if (size > self.minsize and size > self.snapshotsize * self.ratio and
+                self.compactor is None):
+            self.compactor = Thread(target=self.compact)
+            self.compactor.start()
+
+    def compact(self):
+        with self.lock:
+            self.journal.close()
+            os.replace(self.journalname, self.compactname)
+            self.journal = open(self.journalname, 'a')
+            data = self.dump()
+        self.write(data)
+        os.remove(self.compactname)
+        self.snapshotsize = len(data)
+        self.compactor = None
+
+    def flush(self):
+        compactor = self.compactor
+        if compactor is not None:
+            compactor.join()
+        with self.lock:
+            if self.journal is not None:
+                self.journal.flush()
+                os.fsync(self.journal.fileno())
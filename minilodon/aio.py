@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+import time
+
+import irc.client
+import irc.schedule
+from irc.client_aio import AioReactor
+
+from minilodon.minilodon import Minilodon
+
+class LoopScheduler(irc.schedule.IScheduler):
+    '''Runs reactor scheduler callbacks as event loop timers.'''
+    def __init__(self, loop):
+        self.loop = loop
+
+    def execute_every(self, period, func):
+        def run():
+            func()
+            self.execute_after(period, run)
+        self.execute_after(period, run)
+
+    def execute_at(self, when, func):
+        if isinstance(when, datetime.datetime):
+            when = when.timestamp()
+        return self.execute_after(when - time.time(), func)
+
+    def execute_after(self, delay, func):
+        if isinstance(delay, datetime.timedelta):
+            delay = delay.total_seconds()
+        return self.loop.call_later(max(delay, 0), func)
+
+    def run_pending(self):
+        pass
+
+_loop = None
+
+def get_loop():
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+    return _loop
+
+class LoopReactor(AioReactor):
+    def __init__(self, loop=None):
+        if loop is None:
+            loop = get_loop()
+        AioReactor.__init__(self, loop=loop)
+        self.scheduler = LoopScheduler(self.loop)
+
+class AsyncMinilodon(Minilodon):
+    '''Minilodon running on an asyncio event loop.
+
+    Scheduled work such as idle kicks and the outbound queue runs as loop
+    timers, and commands or message handlers defined with `async def` are
+    awaited on the loop before their result is sent.
+    '''
+    reactor_class = LoopReactor
+
+    def connect(self, *args, **kwargs):
+        coro = self.connection.connect(*args, **kwargs)
+        if not self.reactor.loop.is_running():
+            try:
+                return self.reactor.loop.run_until_complete(coro)
+            except OSError as error:
+                self.connect_failed(error)
+                return
+        future = asyncio.ensure_future(coro, loop=self.reactor.loop)
+        future.add_done_callback(self.on_connect_done)
+
+    def on_connect_done(self, future):
+        if future.cancelled() or future.exception() is None:
+            return
+        self.connect_failed(future.exception())
+
+    def connect_failed(self, error):
+        self.logger.error("Connection failed: %s", error)
+        self.connection._handle_event(
+            irc.client.Event("disconnect", self.connection.server, "", [""]))
+
+    def call_soon(self, func, *args):
+        self.reactor.loop.call_soon_threadsafe(func, *args)
+
+    def run_async(self, awaitable, callback):
+        future = asyncio.ensure_future(awaitable, loop=self.reactor.loop)
+        def done(future):
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                self.logger.error("Handler failed: %s", future.exception())
+                return
+            callback(future.result())
+        future.add_done_callback(done)
@@ -0,0 +1,342 @@
+from collections import OrderedDict, deque
+from threading import Lock, Thread
+import json
+import os
+import re
+
+from minilodon import util
+
+PREFIX_LEN = len("01-01-16 12:00:00 ")
+MAXDAYS = 31
+MESSAGE_REGEX = re.compile(r"<([^>\s]+)> ")
+WORD_REGEX = re.compile(r"\w+")
+
+def tokenize(text):
+    return set(WORD_REGEX.findall(text.lower()))
+
+def recent(logs, days=MAXDAYS):
+    '''The logs of the newest `days` dates from a newest first list.'''
+    result = []
+    dates = set()
+    for log in logs:
+        dates.add(log[0])
+        if len(dates) > days:
+            break
+        result.append(log)
+    return result
+
+class DayIndex(object):
+    '''Index of the messages in one daily log file.
+
+    Maps each nick, and optionally each word, to the byte offsets of the
+    lines they appear in. `size` is how much of the log file is covered; on
+    load, lines written after the sidecar was saved are read from the log.
+    '''
+    def __init__(self, path, tokens=False):
+        self.path = path
+        self.indexpath = path + '.idx'
+        self.tokens = tokens
+        self.nicks = {}
+        self.words = {}
+        self.size = 0
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path, tokens=False):
+        index = cls(path, tokens)
+        if os.path.exists(index.indexpath):
+            with open(index.indexpath) as index_file:
+                try:
+                    data = json.load(index_file)
+                except ValueError:
+                    data = None
+            if data is not None and data.get('tokens') == tokens:
+                index.nicks = data['nicks']
+                index.words = data['words']
+                index.size = data['size']
+                if not os.path.exists(path):
+                    return index
+        index.catch_up()
+        return index
+
+    def catch_up(self):
+        logfile = util.open_log_reader(self.path)
+        if logfile is None:
+            return
+        with logfile:
+            logfile.seek(self.size)
+            offset = self.size
+            for line in logfile:
+                if not line.endswith(b'\n'):
+                    break
+                self.add(offset, line.decode('utf-8', 'replace'))
+                offset += len(line)
+
+    def add(self, offset, line):
+        '''Indexes the line at `offset` and returns its nick, if any.'''
+        if offset < self.size:
+            return None
+        self.size = offset + len(line.encode('utf-8', 'replace'))
+        self.dirty = True
+        match = MESSAGE_REGEX.match(line, PREFIX_LEN)
+        if match is None:
+            return None
+        nick = match.group(1).lower()
+        self.nicks.setdefault(nick, []).append(offset)
+        if self.tokens:
+            for word in tokenize(line[match.end():]):
+                self.words.setdefault(word, []).append(offset)
+        return nick
+
+    def save(self):
+        data = {'size': self.size, 'tokens': self.tokens,
+                'nicks': self.nicks, 'words': self.words}
+        util.write_atomic(self.indexpath,
+                          json.dumps(data, separators=(',', ':')))
+        self.dirty = False
+
+class Archive(object):
+    '''Searchable index over the daily channel logs in `directory`.
+
+    The log writer thread feeds every written line to `add`, and a day's
+    index is saved next to its log as `<log>.idx` when the log is closed.
+    Indexes of older days are loaded on demand, at most `cachesize` at a
+    time. The day and offset of each nick's latest message per channel are
+    kept in `seen.json`, so `seen` reads a single line per channel. Searches
+    look at most `MAXDAYS` days back.
+    '''
+    def __init__(self, directory='', tokens=False, cachesize=32):
+        self.directory = directory
+        self.tokens = tokens
+        self.cachesize = cachesize
+        self.days = OrderedDict()
+        self.lock = Lock()
+        self.seenpath = os.path.join(directory, 'seen.json')
+        self.latest = None
+        self.date = ''
+        self.dirty = False
+        self.builder = None
+
+    def add(self, path, offset, line):
+        with self.lock:
+            self.load()
+            nick = self.day(path).add(offset, line)
+            if nick is not None:
+                date, channel = self.split(path)
+                self.latest.setdefault(nick, {})[channel] = [date, offset]
+                self.date = max(self.date, date)
+                self.dirty = True
+
+    def close(self, path):
+        with self.lock:
+            index = self.days.get(os.path.abspath(path))
+            if index is not None and index.dirty:
+                index.save()
+            if self.dirty:
+                self.save()
+
+    def load(self):
+        '''Loads the latest messages per nick; call with the lock held.
+
+        Days from the last saved one onwards are merged in again from their
+        indexes, which picks up lines written after `seen.json` was saved.
+        Without `seen.json`, the logs of the last `MAXDAYS` days are indexed
+        by a background thread so writing and lookups carry on meanwhile.
+        '''
+        if self.latest is not None:
+            return
+        data = None
+        if os.path.exists(self.seenpath):
+            with open(self.seenpath) as seen_file:
+                try:
+                    data = json.load(seen_file)
+                except ValueError:
+                    data = None
+        self.latest = data['nicks'] if data else {}
+        self.date = data['date'] if data else ''
+        logs = self.logs()
+        if data is None:
+            if logs:
+                self.builder = Thread(target=self.build,
+                                      args=(recent(logs),))
+                self.builder.daemon = True
+                self.builder.start()
+            return
+        for date, channel, path in reversed(logs):
+            if date >= self.date:
+                self.merge(date, channel, self.day(path))
+
+    def build(self, logs):
+        for date, channel, path in reversed(logs):
+            index = DayIndex.load(path, self.tokens)
+            with self.lock:
+                self.merge(date, channel, index)
+        with self.lock:
+            self.save()
+
+    def merge(self, date, channel, index):
+        for nick, offsets in index.nicks.items():
+            entries = self.latest.setdefault(nick, {})
+            latest = [date, offsets[-1]]
+            if channel not in entries or entries[channel] < latest:
+                entries[channel] = latest
+        self.date = max(self.date, date)
+        self.dirty = True
+
+    def save(self):
+        data = {'date': self.date, 'nicks': self.latest}
+        util.write_atomic(self.seenpath,
+                          json.dumps(data, separators=(',', ':')))
+        self.dirty = False
+
+    def split(self, path):
+        '''Returns the date and channel of a log file path.'''
+        return (os.path.basename(path)[:8],
+                os.path.basename(os.path.dirname(os.path.abspath(path))))
+
+    def path(self, date, channel):
+        return os.path.join(self.directory, channel,
+                            '{}-{}.log'.format(date, channel))
+
+    def day(self, path):
+        key = os.path.abspath(path)
+        index = self.days.get(key)
+        if index is not None:
+            self.days.move_to_end(key)
+            return index
+        index = DayIndex.load(path, self.tokens)
+        self.days[key] = index
+        while len(self.days) > self.cachesize:
+            _, old = self.days.popitem(last=False)
+            if old.dirty:
+                old.save()
+        return index
+
+    def logs(self):
+        '''All log files as (date, channel, path), newest first.'''
+        result = []
+        directory = self.directory or '.'
+        if not os.path.isdir(directory):
+            return result
+        for channel in os.listdir(directory):
+            path = os.path.join(self.directory, channel)
+            if not os.path.isdir(path):
+                continue
+            suffix = '-{}.log'.format(channel)
+            for name in os.listdir(path):
+                if name.endswith(suffix + '.gz'):
+                    name = name[:-3]
+                elif not name.endswith(suffix):
+                    continue
+                result.append((name[:8], channel, os.path.join(path, name)))
+        result.sort(reverse=True)
+        return result
+
+    def read(self, path, offset):
+        logfile = util.open_log_reader(path)
+        if logfile is None:
+            return ''
+        with logfile:
+            logfile.seek(offset)
+            line = logfile.readline()
+        return line.decode('utf-8', 'replace').rstrip('\n')
+
+    def lastlog(self, nick, count=5, days=7):
+        '''The last `count` messages of `nick`, newest first.
+
+        Only the `days` days up to the nick's latest message are searched.
+        '''
+        with self.lock:
+            self.load()
+            entries = dict(self.latest.get(nick.lower(), {}))
+        if not entries:
+            return []
+        newest = max(date for date, _ in entries.values())
+        days = min(days, MAXDAYS)
+        result = []
+        dates = set()
+        for date, channel, path in self.logs():
+            if date > newest or channel not in entries:
+                continue
+            dates.add(date)
+            if len(dates) > days:
+                break
+            with self.lock:
+                offsets = list(self.day(path).nicks.get(nick.lower(), ()))
+            for offset in reversed(offsets):
+                line = self.read(path, offset)
+                if line:
+                    result.append((channel, line))
+                if len(result) >= count:
+                    return result
+        return result
+
+    def seen(self, nick):
+        with self.lock:
+            self.load()
+            entries = dict(self.latest.get(nick.lower(), {}))
+        best = None
+        for channel, (date, offset) in entries.items():
+            line = self.read(self.path(date, channel), offset)
+            if not line:
+                continue
+            key = (date, line[9:17])
+            if best is None or key > best[0]:
+                best = (key, channel, line)
+        return best[1:] if best is not None else None
+
+    def grep(self, pattern, days=7, count=5):
+        regex = re.compile(pattern, re.IGNORECASE)
+        words = None
+        if self.tokens and re.match(r"^[\w ]+$", pattern):
+            words = tokenize(pattern)
+        days = min(days, MAXDAYS)
+        result = []
+        dates = set()
+        for date, channel, path in self.logs():
+            dates.add(date)
+            if len(dates) > days:
+                break
+            for line in self.search(path, regex, words, count - len(result)):
+                result.append((channel, line))
+                if len(result) >= count:
+                    return result
+        return result
+
+    def search(self, path, regex, words, count):
+        '''Yields up to `count` lines of one log, newest first, whose message
+        text matches `regex`.
+
+        With `words`, only lines holding a word that contains each of them
+        are read, so indexed and unindexed searches match the same lines.
+        '''
+        if not words:
+            logfile = util.open_log_reader(path)
+            if logfile is None:
+                return
+            matches = deque(maxlen=count)
+            with logfile:
+                for line in logfile:
+                    line = line.decode('utf-8', 'replace').rstrip('\n')
+                    if search_message(regex, line):
+                        matches.append(line)
+            yield from reversed(matches)
+            return
+        with self.lock:
+            index = self.day(path)
+            candidates = None
+            for word in words:
+                offsets = set()
+                for key, positions in index.words.items():
+                    if word in key:
+                        offsets.update(positions)
+                candidates = offsets if candidates is None \
+                             else candidates & offsets
+        for offset in sorted(candidates, reverse=True):
+            line = self.read(path, offset)
+            if search_message(regex, line):
+                yield line
+
+def search_message(regex, line):
+    match = MESSAGE_REGEX.match(line, PREFIX_LEN)
+    return match is not None and regex.search(line, match.end()) is not None
@@ -0,0 +1,225 @@
+'''Offline benchmarks for Minilodon.
+
+Usage: python -m minilodon.bench timestamps [-n lines]
+       python -m minilodon.bench events [-n count] [-s scenario ...]
+       python -m minilodon.bench events --replay file [--channel channel]
+
+`events` feeds IRC events through a Minilodon instance whose connection
+only counts what is sent, and reports throughput, handler latency, threads
+and memory. Replay files hold raw IRC lines as received from a server.
+'''
+from collections import OrderedDict
+from datetime import datetime
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+import irc.client
+
+from minilodon.logwriter import Clock
+from minilodon.minilodon import Minilodon
+
+NICK = 'minilodon'
+CONFIG = {'server': 'localhost', 'port': 6667, 'nick': NICK,
+          'mainchannel': '#bench', 'controlchannel': '#bench-control'}
+LINE_REGEX = re.compile(r"^:(\S+) (\S+)((?: (?!:)\S+)*)(?: :(.*))?$")
+COMMANDS = {'PRIVMSG': 'pubmsg', 'JOIN': 'join', 'PART': 'part',
+            'QUIT': 'quit', 'NICK': 'nick', 'KICK': 'kick',
+            '353': 'namreply', '366': 'endofnames'}
+
+def bench_timestamps(lines=1000000, rate=100.0):
+    '''Formats `lines` log timestamps arriving at `rate` lines per second.
+
+    Returns the seconds taken by strftime on every line and by Clock.
+    '''
+    start = time.time()
+    timestamps = [start + i / rate for i in range(lines)]
+    began = time.perf_counter()
+    for timestamp in timestamps:
+        datetime.fromtimestamp(timestamp).strftime("%d-%m-%y %H:%M:%S")
+    strftime = time.perf_counter() - began
+    clock = Clock()
+    began = time.perf_counter()
+    for timestamp in timestamps:
+        clock.format(timestamp)
+    cached = time.perf_counter() - began
+    return strftime, cached
+
+def run_timestamps(args):
+    strftime, cached = bench_timestamps(args.lines)
+    print("strftime: {:.0f} ns/line".format(strftime / args.lines * 1e9))
+    print("Clock:    {:.0f} ns/line".format(cached / args.lines * 1e9))
+    print("speedup:  {:.1f}x".format(strftime / cached))
+
+class FakeConnection(object):
+    '''Stands in for the server connection and counts what is sent.'''
+    def __init__(self, nick):
+        self.nick = nick
+        self.sent = 0
+
+    def get_nickname(self):
+        return self.nick
+
+    def is_connected(self):
+        return True
+
+    def send(self, *args):
+        self.sent += 1
+
+    def __getattr__(self, name):
+        return self.send
+
+def event(type, source, target, arguments=()):
+    return irc.client.Event(type, irc.client.NickMask(source), target,
+                            list(arguments))
+
+def user(i):
+    return 'user{0}!u{0}@host{0}.example'.format(i)
+
+def names(count, channel='#bench', chunk=400):
+    for start in range(0, count, chunk):
+        nicks = ['user{}'.format(i)
+                 for i in range(start, min(start + chunk, count))]
+        yield event('namreply', 'server', NICK,
+                    ['=', channel, ' '.join(nicks)])
+    yield event('endofnames', 'server', NICK,
+                [channel, 'End of /NAMES list.'])
+
+def pubmsg_flood(count, users=200):
+    return (list(names(users)),
+            [event('pubmsg', user(i % users), '#bench',
+                   ['message number {}'.format(i)]) for i in range(count)])
+
+def netsplit(count):
+    events = [event('join', user(i), '#bench') for i in range(count)]
+    events.extend(event('quit', user(i), None, ['*.net *.split'])
+                  for i in range(count))
+    return [], events
+
+def names_reply(count):
+    return [], list(names(count))
+
+def nick_storm(count):
+    return (list(names(count)),
+            [event('nick', user(i), 'user{}_'.format(i))
+             for i in range(count)])
+
+SCENARIOS = OrderedDict([('pubmsg', pubmsg_flood), ('netsplit', netsplit),
+                         ('names', names_reply), ('nicks', nick_storm)])
+
+def parse_line(line):
+    '''Turns a raw IRC line into an Event, or None if it is not replayed.'''
+    match = LINE_REGEX.match(line.rstrip('\r\n'))
+    if match is None:
+        return None
+    source, command, params, trailing = match.groups()
+    type = COMMANDS.get(command.upper())
+    if type is None:
+        return None
+    params = params.split()
+    if trailing is not None:
+        params.append(trailing)
+    if type == 'quit':
+        return event(type, source, None, params)
+    if type == 'pubmsg' and params and not params[0].startswith('#'):
+        type = 'privmsg'
+    return event(type, source, params[0] if params else None, params[1:])
+
+def replay(filename):
+    with open(filename, encoding='utf-8', errors='replace') as replay_file:
+        events = [parse_line(line) for line in replay_file]
+    return [], [e for e in events if e is not None]
+
+def rss():
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+def bench_events(prelude, events, channel='#bench'):
+    '''Dispatches `events` through a fresh bot after untimed `prelude`.
+
+    Returns a dict with the event count, events per second, p50 and p99
+    latency in seconds, the number of threads and the RSS in bytes.
+    '''
+    directory = tempfile.mkdtemp()
+    try:
+        bot = Minilodon(dict(CONFIG, mainchannel=channel, logdir=directory))
+        connection = bot.connection = FakeConnection(NICK)
+        bot.logwriter.start()
+        for target in (bot.control_channel, bot.channel):
+            bot._dispatcher(connection, event('join', NICK + '!bot@host',
+                                              target))
+        for e in prelude:
+            bot._dispatcher(connection, e)
+        bot.burst.flush()
+        latencies = []
+        began = time.perf_counter()
+        for e in events:
+            start = time.perf_counter()
+            bot._dispatcher(connection, e)
+            latencies.append(time.perf_counter() - start)
+        bot.burst.flush()
+        elapsed = time.perf_counter() - began
+        result = {'events': len(events),
+                  'rate': len(events) / elapsed if elapsed else 0.0,
+                  'threads': threading.active_count(),
+                  'rss': rss(),
+                  'sent': connection.sent}
+        latencies.sort()
+        result['p50'] = percentile(latencies, 0.5)
+        result['p99'] = percentile(latencies, 0.99)
+        bot.logwriter.stop()
+        return result
+    finally:
+        shutil.rmtree(directory)
+
+def run_events(args):
+    if args.replay:
+        runs = [('replay', replay(args.replay))]
+    else:
+        runs = [(name, SCENARIOS[name](args.count))
+                for name in args.scenario or SCENARIOS]
+    print("{:<10} {:>8} {:>12} {:>9} {:>9} {:>7} {:>8}".format(
+        'scenario', 'events', 'events/s', 'p50 us', 'p99 us', 'threads',
+        'RSS MB'))
+    for name, (prelude, events) in runs:
+        result = bench_events(prelude, events, args.channel)
+        print("{:<10} {:>8} {:>12.0f} {:>9.1f} {:>9.1f} {:>7} {:>8.1f}".format(
+            name, result['events'], result['rate'], result['p50'] * 1e6,
+            result['p99'] * 1e6, result['threads'], result['rss'] / 2 ** 20))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m minilodon.bench')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    timestamps = commands.add_parser('timestamps',
+                                     help='log timestamp formatting')
+    timestamps.add_argument('-n', '--lines', type=int, default=1000000)
+    timestamps.set_defaults(func=run_timestamps)
+    events = commands.add_parser('events', help='IRC event handling')
+    events.add_argument('-n', '--count', type=int, default=5000)
+    events.add_argument('-s', '--scenario', action='append',
+                        choices=list(SCENARIOS))
+    events.add_argument('--replay', metavar='FILE',
+                        help='raw IRC lines to replay instead')
+    events.add_argument('--channel', default='#bench',
+                        help='main channel of the replayed lines')
+    events.set_defaults(func=run_events)
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
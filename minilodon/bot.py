@@ -1,20 +1,37 @@
-from urllib import parse
-from threading import Timer
-import json
+from functools import partial
+from threading import Lock, Timer
+import asyncio
 import logging
 import time
 import re
 import random
 
-from youtube_dl import YoutubeDL
-from youtube_dl.utils import DownloadError
-
+from minilodon import metrics
+from minilodon.actions import ActionStore, JournalActionStore
+from minilodon.cache import PreviewCache
 from minilodon.minilodon import Minilodon
+from minilodon.preview import Previewer
+from minilodon.profiler import PROFILER
+from minilodon.urls import URLScanner
 
-bot = Minilodon("config.json")
+bot = Minilodon.create("config.json")
 logger = logging.getLogger(__name__)
-ydl = YoutubeDL({'quiet': False, 'logger': logger, 'noplaylist': True, 'extract_flat': 'in_playlist'})
-ydl.add_default_info_extractors()
+cache = PreviewCache(bot.config.get('previewcachesize', 1024),
+                     bot.config.get('previewcachettl', 86400.0),
+                     filename=bot.config.get('previewcache'))
+previewer = Previewer(lambda url: fetch_preview(url),
+                      bot.config.get('previewworkers', 2),
+                      bot.config.get('previewqueue', 8),
+                      bot.config.get('previewtimeout', 15.0))
+scanner = URLScanner(bot.config.get('previewwindow', 60.0))
+ydl = None
+ydl_lock = Lock()
+PREVIEWS = metrics.REGISTRY.histogram('minilodon_preview_seconds',
+                                      'Time spent extracting link previews.')
+if bot.config.get('actionsjournal', False):
+    actions = JournalActionStore("actions.json")
+else:
+    actions = ActionStore("actions.json")
 spy_function = None
 spy_timer = None
 roll_regex = re.compile(r"([0-9]*)d([0-9]+)")
@@ -27,21 +44,18 @@ def update(nick, args):
     category = args[1].lower()
     key = args[2].lower()
     msg = " ".join(args[3:])
-    if len(msg) > 254:
+    if len(msg.encode('utf-8')) > bot.budget(bot.channel, msg):
         yield "Warning: Entry too long, message will be wrapped."
     try:
-        msg.format(victim="victim", nick="nick")
+        created = actions.set(category, key, msg)
     except KeyError as error:
         yield "Failed to parse message on {}".format(str(error))
         return
-    actions = parse_actions("actions.json")
-    if category not in actions:
-        actions[category] = {}
-    actions[category][key] = msg
-    with open("actions.json", "w") as actions_file:
-        json.dump(actions, actions_file, indent=2, separators=(',', ': '),
-                  sort_keys=True)
-    load_actions()
+    except ValueError as error:
+        yield "Failed to parse message: {}".format(error)
+        return
+    if created:
+        add_category(category)
     yield "{} added to {}.".format(key, category)
 
 @bot.command("updateme", True)
@@ -55,18 +69,13 @@ def updateme(nick, args):
 def delete(nick, args):
     if len(args) != 3:
         return "Usage: !delete <category> <key>"
-    actions = parse_actions("actions.json")
     category = args[1].lower()
     key = args[2].lower()
     if category not in actions:
         return "Category {} not found!".format(category)
-    if key not in actions[category]:
+    if actions.get(category, key) is None:
         return "Key {} not found in {}".format(key, category)
-    del actions[category][key]
-    with open("actions.json", "w") as f:
-        json.dump(actions, f, indent=2, separators=(',', ': '),
-                  sort_keys=True)
-    load_actions()
+    actions.delete(category, key)
     return "{} removed from {}.".format(key, category)
 
 @bot.command("say", True)
@@ -126,15 +135,19 @@ def spy(nick, args):
     spy_timer = Timer(900.0, stop_spy)
     return "Room {} wordt 15 minuten bespioneerd.".format(bot.channel)
 
+@bot.command("cache", True)
+def cache_stats(nick, args):
+    return ("Preview cache: {} entries, {} hits, {} misses."
+            .format(len(cache), cache.hits, cache.misses))
+
 @bot.command("list")
 def list_all(nick, args):
     if len(args) != 2:
         return "Usage: !list <category>"
-    actions = parse_actions("actions.json")
     category = args[1]
     if category not in actions:
         return "{} niet gevonden.".format(category)
-    msg = "Alle {}: {}".format(category, ", ".join(actions[category].keys()))
+    msg = "Alle {}: {}".format(category, ", ".join(actions.keys(category)))
     bot.send_priv_msg(nick, msg)
     return "Zie prive voor een lijst van alle opties."
 
@@ -164,18 +177,141 @@ def _die(die, amount):
     else:
         return [str(random.randint(1, die)) for x in range(amount)]
 
+@bot.command("seen", True)
+def seen(nick, args):
+    if len(args) != 2:
+        return "Usage: !seen <nick>"
+    if bot.archive is None:
+        return "Log index is not enabled."
+    return in_background(find_seen, bot.archive, args[1])
+
+@bot.command("lastlog", True)
+def lastlog(nick, args):
+    if len(args) != 2:
+        return "Usage: !lastlog <nick>"
+    if bot.archive is None:
+        return "Log index is not enabled."
+    return in_background(find_lastlog, bot.archive, args[1])
+
+@bot.command("grep", True)
+def grep(nick, args):
+    if len(args) not in (2, 3) or (len(args) == 3 and not args[2].isdigit()):
+        return "Usage: !grep <pattern> [days]"
+    if bot.archive is None:
+        return "Log index is not enabled."
+    days = int(args[2]) if len(args) == 3 else 7
+    try:
+        re.compile(args[1])
+    except re.error as error:
+        return "Invalid pattern: {}".format(error)
+    return in_background(find_grep, bot.archive, args[1], days)
+
+async def in_background(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+def find_seen(archive, name):
+    result = archive.seen(name)
+    if result is None:
+        return "{} not seen.".format(name)
+    return "{} {}".format(*result)
+
+def find_lastlog(archive, name):
+    result = archive.lastlog(name)
+    if not result:
+        return "{} not seen.".format(name)
+    return ["{} {}".format(*line) for line in reversed(result)]
+
+def find_grep(archive, pattern, days):
+    result = archive.grep(pattern, days)
+    if not result:
+        return "No matches."
+    return ["{} {}".format(*line) for line in reversed(result)]
+
+@bot.command("profile", True)
+def profile(nick, args):
+    usage = "Usage: !profile <on [threshold]|off|top|dump|reset>"
+    if len(args) < 2:
+        return usage
+    if args[1] == "on":
+        if len(args) > 2:
+            try:
+                PROFILER.threshold = float(args[2])
+            except ValueError:
+                return usage
+        PROFILER.enabled = True
+        return "Profiling on, logging events slower than {}s.".format(
+            PROFILER.threshold)
+    if args[1] == "off":
+        PROFILER.enabled = False
+        return "Profiling off."
+    if args[1] == "top":
+        return PROFILER.report() or "No samples."
+    if args[1] == "dump":
+        filename = bot.config.get('profilefile', 'minilodon.prof')
+        if not PROFILER.dump(filename):
+            return "No samples."
+        return "Wrote profile to {}.".format(filename)
+    if args[1] == "reset":
+        PROFILER.reset()
+        return "Samples cleared."
+    return usage
+
 @bot.message()
 def on_message(nick, msg):
     if spy_function:
         spy_function(nick, msg)
-    if parse.urlsplit(msg).scheme.startswith("http"):
-        yield video(msg)
+    results = []
+    misses = []
+    for url in scanner.scan(msg):
+        hit, result = cache.get(url)
+        if not hit:
+            misses.append(url)
+        elif result is not None:
+            results.append(result)
+    if misses:
+        previewer.submit_all(misses, partial(post_preview, bot.current))
+    if results:
+        return results
+
+def fetch_preview(url):
+    result = PROFILER.run('preview', len(url), video, url)
+    cache.put(url, result)
+    return result
+
+def post_preview(instance, result):
+    instance.call_soon(instance.send_msg, result)
+
+def get_ydl():
+    global ydl
+    with ydl_lock:
+        if ydl is None:
+            from youtube_dl import YoutubeDL
+            from youtube_dl.extractor import get_info_extractor
+            params = {'quiet': False, 'logger': logger, 'noplaylist': True,
+                      'extract_flat': 'in_playlist',
+                      'socket_timeout': previewer.timeout}
+            extractors = bot.config.get('extractors')
+            if extractors:
+                for ie_key in extractors:
+                    get_info_extractor(ie_key)
+                instance = YoutubeDL(params, auto_init=False)
+                for ie_key in extractors:
+                    instance.get_info_extractor(ie_key)
+            else:
+                instance = YoutubeDL(params)
+            ydl = instance
+    return ydl
 
 def video(msg):
+    from youtube_dl.utils import DownloadError
+    start = time.perf_counter()
     try:
-        result = ydl.extract_info(msg, download=False)
+        result = get_ydl().extract_info(msg, download=False)
     except DownloadError:
         return
+    finally:
+        PREVIEWS.observe(time.perf_counter() - start)
     if result['extractor_key'] == "Generic" or 'title' not in result:
         return
     if 'duration' in result and result['duration'] is not None:
@@ -199,34 +335,63 @@ def seconds_to_time(seconds):
         return "{0}:{1:02}:{2:02}".format(h, m, s)
     return "{0}:{1:02}".format(m, s)
 
-def parse_actions(filename):
-    with open(filename) as actions_file:
-        return json.load(actions_file)
-
 def load_actions():
-    actions = parse_actions("actions.json")
+    actions.load()
     for category in actions:
-        def _(category):
-            def lookup(nick, args):
-                if len(args) < 2:
-                    return
-                key = args[1].lower()
-                if len(args) > 2:
-                    victim = args[2]
-                else:
-                    victim = nick
-                if key in actions[category]:
-                    return actions[category][key].format(victim=victim,
-                                                         nick=nick)
-                elif key not in bot.commands:
-                    return "Kon {} niet vinden in {}.".format(key, category)
-            bot.commands[category] = lookup
-        _(category)
+        add_category(category)
+
+def add_category(category):
+    def lookup(nick, args):
+        if len(args) < 2:
+            return
+        key = args[1].lower()
+        if len(args) > 2:
+            victim = args[2]
+        else:
+            victim = nick
+        template = actions.template(category, key)
+        if template is not None:
+            return template.render(victim, nick)
+        elif key not in bot.commands:
+            return "Kon {} niet vinden in {}.".format(key, category)
+    bot.commands[category] = lookup
+
+def collect():
+    yield 'minilodon_preview_queued', {}, len(previewer.requests)
+    yield 'minilodon_previews_dropped_total', {}, previewer.dropped
+    yield 'minilodon_previews_expired_total', {}, previewer.expired
+    yield 'minilodon_preview_cache_hits_total', {}, cache.hits
+    yield 'minilodon_preview_cache_misses_total', {}, cache.misses
+    for router, kind in ((bot.commands, 'public'),
+                         (bot.control_commands, 'control')):
+        for name, stats in list(router.stats.items()):
+            labels = {'command': name, 'kind': kind}
+            yield 'minilodon_command_calls_total', labels, stats[0]
+            yield 'minilodon_command_seconds_total', labels, stats[1]
+            yield 'minilodon_command_max_seconds', labels, stats[2]
+
+def start_metrics():
+    metrics.REGISTRY.register(collect)
+    port = bot.config.get('metricsport')
+    if port:
+        metrics.serve(port, bot.config.get('metricshost', '127.0.0.1'))
+    filename = bot.config.get('metricsfile')
+    if filename:
+        bot.reactor.scheduler.execute_every(
+            bot.config.get('metricsinterval', 60.0),
+            lambda: metrics.dump(filename))
 
 def main():
     load_actions()
+    start_metrics()
+    PROFILER.threshold = bot.config.get('profilethreshold', 0.1)
+    PROFILER.samples = bot.config.get('profilesamples', 0)
+    PROFILER.enabled = bot.config.get('profile', False)
+    if bot.config.get('previewwarm', False):
+        previewer.warm(get_ydl)
     try:
         bot.start()
     except KeyboardInterrupt:
+        actions.flush()
         bot.die()
         raise
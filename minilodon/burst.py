@@ -0,0 +1,70 @@
+import time
+
+class Burst(object):
+    '''Coalesces storms of JOIN and QUIT events in the main channel.
+
+    The first event after a quiet period is handled right away. Events that
+    follow within `window` seconds are queued and handed to the bot's
+    `on_burst` in one go `window` seconds after the first of them was
+    queued, so steady traffic never holds an event back for longer than
+    that. At most `limit` events are passed per call so a single flush never
+    holds the reactor for long. `longest`
+    records the slowest flush in seconds.
+    '''
+    def __init__(self, bot, window=1.0, limit=500):
+        self.bot = bot
+        self.window = window
+        self.limit = limit
+        self.events = []
+        self.last = 0
+        self.first = 0
+        self.scheduled = False
+        self.bursts = 0
+        self.largest = 0
+        self.longest = 0.0
+
+    def __len__(self):
+        return len(self.events)
+
+    def add(self, event):
+        curtime = time.time()
+        active = self.events or curtime - self.last < self.window
+        self.last = curtime
+        if not active:
+            return False
+        if not self.events:
+            self.first = curtime
+        self.events.append(event)
+        self.schedule(self.window)
+        return True
+
+    def schedule(self, delay):
+        if self.scheduled:
+            return
+        self.scheduled = True
+        self.bot.reactor.scheduler.execute_after(delay, self.check)
+
+    def check(self):
+        self.scheduled = False
+        if not self.events:
+            return
+        remaining = self.first + self.window - time.time()
+        if remaining > 0 and len(self.events) < self.limit:
+            self.schedule(remaining)
+            return
+        self.flush(self.limit)
+        if self.events:
+            self.schedule(0)
+
+    def flush(self, limit=None):
+        if not self.events:
+            return
+        if limit is None:
+            limit = len(self.events)
+        events, self.events = self.events[:limit], self.events[limit:]
+        start = time.time()
+        self.bot.on_burst(events)
+        duration = time.time() - start
+        self.bursts += 1
+        self.largest = max(self.largest, len(events))
+        self.longest = max(self.longest, duration)
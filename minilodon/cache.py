@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from threading import Lock
+from urllib import parse
+import sqlite3
+import time
+
+TRACKING_PARAMS = {'feature', 'si', 'fbclid', 'gclid'}
+YOUTUBE_HOSTS = {'youtube.com', 'm.youtube.com', 'music.youtube.com'}
+
+def normalize_url(url):
+    parts = parse.urlsplit(url.strip())
+    netloc = parts.netloc.lower()
+    if netloc.startswith('www.'):
+        netloc = netloc[4:]
+    path = parts.path
+    query = [(key, value) for key, value in parse.parse_qsl(parts.query, True)
+             if key not in TRACKING_PARAMS and not key.startswith('utm_')]
+    if netloc == 'youtu.be' and len(path) > 1:
+        query.append(('v', path[1:]))
+        netloc, path = 'youtube.com', '/watch'
+    elif netloc in YOUTUBE_HOSTS:
+        netloc = 'youtube.com'
+    query.sort()
+    return parse.urlunsplit((parts.scheme.lower(), netloc, path,
+                             parse.urlencode(query), ''))
+
+class PreviewCache(object):
+    '''LRU cache of link previews keyed on the normalized URL.
+
+    Failed lookups are cached as None for `negative_ttl` seconds so a dead
+    link pasted repeatedly is only looked up once. When `filename` is set the
+    entries are also kept in a sqlite database and reloaded on startup.
+    '''
+    def __init__(self, maxsize=1024, ttl=86400.0, negative_ttl=600.0,
+                 filename=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if filename is not None:
+            self.open(filename)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def open(self, filename):
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS previews "
+                            "(url TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self.db.execute("DELETE FROM previews WHERE expires < ?",
+                            (time.time(),))
+        rows = self.db.execute("SELECT url, value, expires FROM previews "
+                               "ORDER BY expires DESC LIMIT ?",
+                               (self.maxsize,)).fetchall()
+        for url, value, expires in reversed(rows):
+            self.entries[url] = (value, expires)
+
+    def get(self, url):
+        key = normalize_url(url)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.time():
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, url, value):
+        key = normalize_url(url)
+        ttl = self.negative_ttl if value is None else self.ttl
+        expires = time.time() + ttl
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            evicted = []
+            while len(self.entries) > self.maxsize:
+                evicted.append(self.entries.popitem(last=False)[0])
+            if self.db is not None:
+                with self.db:
+                    self.db.execute("INSERT OR REPLACE INTO previews "
+                                    "VALUES (?, ?, ?)", (key, value, expires))
+                    self.db.executemany("DELETE FROM previews WHERE url = ?",
+                                        [(url,) for url in evicted])
+
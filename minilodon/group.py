@@ -0,0 +1,67 @@
+import select
+import sys
+import time
+
+from minilodon.aio import AsyncMinilodon
+
+class BotGroup(object):
+    '''Several Minilodon instances, one per network, in a single process.
+
+    The instances share their command and message registrations, so the
+    `@bot.command` and `@bot.message` decorators apply to all of them, and
+    all of them are driven by one event loop. Other attributes are looked up
+    on the instance that is handling the current event, so command functions
+    written for a single bot work unchanged.
+    '''
+    def __init__(self, bots):
+        if len(set(isinstance(bot, AsyncMinilodon) for bot in bots)) > 1:
+            raise ValueError("Cannot mix asyncio and select based networks")
+        self.bots = bots
+        self.current = bots[0]
+        for bot in bots:
+            bot.group = self
+            bot.commands = bots[0].commands
+            bot.control_commands = bots[0].control_commands
+            bot.on_message = bots[0].on_message
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+    def __iter__(self):
+        return iter(self.bots)
+
+    def start(self):
+        for bot in self.bots:
+            bot.prepare()
+            bot._connect()
+        if isinstance(self.bots[0], AsyncMinilodon):
+            self.bots[0].reactor.loop.run_forever()
+        else:
+            self.process_forever()
+
+    def process_forever(self, timeout=0.2):
+        while True:
+            self.process_once(timeout)
+
+    def process_once(self, timeout=0):
+        reactors = {}
+        for bot in self.bots:
+            for sock in bot.reactor.sockets:
+                reactors[sock] = bot.reactor
+        if reactors:
+            ready = select.select(list(reactors), [], [], timeout)[0]
+            for sock in ready:
+                reactors[sock].process_data([sock])
+        else:
+            time.sleep(timeout)
+        for bot in self.bots:
+            bot.reactor.process_timeout()
+
+    def die(self, msg="Bye, cruel world!"):
+        for bot in self.bots:
+            bot.logwriter.stop()
+            if bot.rotator is not None:
+                bot.rotator.stop()
+            bot.save_idle()
+            bot.connection.disconnect(msg)
+        sys.exit(0)
@@ -1,37 +1,125 @@
-from threading import Thread, Event
-import time
-
-class Kicker(Thread):
-    def __init__(self, bot, channel, nick, idletime):
-        Thread.__init__(self)
-        self.bot = bot
-        self.channel = channel
-        self.nick = nick
-        self.idletime = idletime
-        self.resetter = Event()
-        self.canceled = False
-        self.daemon = True
-        self.time = time.time()
-
-    def run(self):
-        while not self.canceled:
-            self.time = time.time()
-            self.resetter.wait(self.idletime)
-            if not self.resetter.isSet() and not self.canceled:
-                self.bot.connection.kick(self.channel, self.nick,
-                                         "Idle too long!")
-                self.bot.send_msg("Kicked {} due to inactivity."
-                                  .format(self.nick), True)
-                self.canceled = True
-            else:
-                self.resetter.clear()
-
-    def reset(self):
-        self.resetter.set()
-
-    def cancel(self):
-        self.canceled = True
-        self.resetter.set()
-
-    def changenick(self, nick):
-        self.nick = nick
+from collections import OrderedDict
+from functools import partial
+import json
+import os
+import time
+
+from minilodon import util
+
+class Kicker(object):
+    def __init__(self, tracker, nick):
+        self.tracker = tracker
+        self.nick = nick
+        self.canceled = False
+        self.time = time.time()
+
+    def reset(self):
+        if not self.canceled:
+            self.tracker.touch(self)
+
+    def cancel(self):
+        self.canceled = True
+        self.tracker.discard(self)
+
+    def changenick(self, nick):
+        self.nick = nick
+
+class IdleTracker(object):
+    '''Tracks the last time each nick spoke and kicks them on expiry.
+
+    Every nick shares the same idle time, so keeping the kickers ordered by
+    last activity means the front of the queue always holds the next
+    deadline. Resetting moves a kicker to the back, which is O(1), and a
+    single scheduled check on the reactor replaces one thread per nick.
+    Scheduling an earlier check supersedes the pending one, which then
+    does nothing when it fires.
+    '''
+    def __init__(self, bot, idletime):
+        self.bot = bot
+        self.idletime = idletime
+        self.kickers = OrderedDict()
+        self.due = None
+        self.generation = 0
+        self.paused = False
+
+    def __len__(self):
+        return len(self.kickers)
+
+    def add(self, nick):
+        kicker = Kicker(self, nick)
+        self.kickers[kicker] = None
+        self.schedule(self.idletime)
+        return kicker
+
+    def touch(self, kicker):
+        kicker.time = time.time()
+        if kicker in self.kickers:
+            self.kickers.move_to_end(kicker)
+
+    def discard(self, kicker):
+        self.kickers.pop(kicker, None)
+
+    def schedule(self, delay):
+        delay = max(delay, 0)
+        due = time.time() + delay
+        if self.due is not None and self.due <= due:
+            return
+        self.due = due
+        self.generation += 1
+        self.bot.reactor.scheduler.execute_after(
+            delay, partial(self.check, self.generation))
+
+    def snapshot(self):
+        return {kicker.nick: int(kicker.time) for kicker in self.kickers}
+
+    def restore(self, times):
+        times = {nick.lower(): last_seen for nick, last_seen in times.items()}
+        for kicker in self.kickers:
+            last_seen = times.get(kicker.nick.lower())
+            if last_seen is not None and last_seen < kicker.time:
+                kicker.time = last_seen
+        self.kickers = OrderedDict(sorted(self.kickers.items(),
+                                          key=lambda item: item[0].time))
+        if self.kickers and not self.paused:
+            kicker = next(iter(self.kickers))
+            self.schedule(kicker.time + self.idletime - time.time())
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            self.schedule(0)
+
+    def check(self, generation=None):
+        if generation is not None and generation != self.generation:
+            return
+        self.due = None
+        if self.paused:
+            return
+        curtime = time.time()
+        while self.kickers:
+            kicker = next(iter(self.kickers))
+            remaining = kicker.time + self.idletime - curtime
+            if remaining > 0:
+                self.schedule(remaining)
+                return
+            self.expire(kicker)
+
+    def expire(self, kicker):
+        kicker.cancel()
+        self.bot.kick(kicker.nick, "Idle too long!",
+                      "Kicked {} due to inactivity.".format(kicker.nick))
+
+def save_snapshot(filename, times):
+    util.write_atomic(filename, json.dumps(times, separators=(',', ':')))
+
+def load_snapshot(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as snapshot_file:
+        try:
+            return json.load(snapshot_file)
+        except ValueError:
+            return {}
@@ -0,0 +1,135 @@
+'''Statistics over Minilodon channel logs.
+
+Usage: python -m minilodon.logstats [-f csv|json] [-r report] [-j workers]
+                                    path [path ...]
+
+Each path is a log file or a directory searched for log files. Files are
+parsed in parallel, one per worker process.
+'''
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import argparse
+import csv
+import gzip
+import json
+import mmap
+import os
+import re
+import sys
+
+MESSAGE_REGEX = re.compile(rb"^(\d\d-\d\d-\d\d) (\d\d):\d\d:\d\d <([^>\s]+)> ",
+                           re.MULTILINE)
+KICK_REGEX = re.compile(rb"^(\d\d-\d\d-\d\d) \d\d:\d\d:\d\d <[^>\s]+> "
+                        rb"Kicked (\S+) due to inactivity\.$", re.MULTILINE)
+REPORTS = ('messages', 'heatmap', 'kicks')
+
+def find_logs(paths):
+    result = []
+    for path in paths:
+        if not os.path.isdir(path):
+            result.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            result.extend(os.path.join(root, name) for name in names
+                          if name.endswith(('.log', '.log.gz')))
+    result.sort()
+    return result
+
+def parse_day(prefix):
+    '''Returns the ISO date and weekday of a b"dd-mm-yy" prefix.'''
+    day = date(2000 + int(prefix[6:8]), int(prefix[3:5]), int(prefix[0:2]))
+    return day.isoformat(), day.weekday()
+
+def scan(data):
+    messages = Counter()
+    heatmap = Counter()
+    kicks = Counter()
+    days = {}
+    lines = Counter(MESSAGE_REGEX.findall(data))
+    for (prefix, hour, nick), count in lines.items():
+        day = lookup_day(days, prefix)
+        if day is None:
+            continue
+        messages[day[0], nick.decode('utf-8', 'replace')] += count
+        heatmap[day[1], int(hour)] += count
+    for (prefix, nick), count in Counter(KICK_REGEX.findall(data)).items():
+        day = lookup_day(days, prefix)
+        if day is not None:
+            kicks[day[0], nick.decode('utf-8', 'replace')] += count
+    return messages, heatmap, kicks
+
+def lookup_day(days, prefix):
+    if prefix not in days:
+        try:
+            days[prefix] = parse_day(prefix)
+        except ValueError:
+            days[prefix] = None
+    return days[prefix]
+
+def scan_file(path):
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as logfile:
+            return scan(logfile.read())
+    with open(path, 'rb') as logfile:
+        if os.fstat(logfile.fileno()).st_size == 0:
+            return Counter(), Counter(), Counter()
+        with mmap.mmap(logfile.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return scan(data)
+
+def collect(paths, workers=None):
+    messages = Counter()
+    heatmap = Counter()
+    kicks = Counter()
+    with ProcessPoolExecutor(workers) as executor:
+        for result in executor.map(scan_file, find_logs(paths),
+                                   chunksize=16):
+            messages.update(result[0])
+            heatmap.update(result[1])
+            kicks.update(result[2])
+    return messages, heatmap, kicks
+
+def write_csv(stats, report, out):
+    writer = csv.writer(out)
+    if report == 'heatmap':
+        writer.writerow(['weekday', 'hour', 'messages'])
+        rows = stats[1]
+    else:
+        writer.writerow(['date', 'nick', report])
+        rows = stats[0] if report == 'messages' else stats[2]
+    for key in sorted(rows):
+        writer.writerow(list(key) + [rows[key]])
+
+def write_json(stats, out):
+    messages, heatmap, kicks = stats
+    result = {'messages': {}, 'kicks': {},
+              'heatmap': [[heatmap[weekday, hour] for hour in range(24)]
+                          for weekday in range(7)]}
+    for name, counts in (('messages', messages), ('kicks', kicks)):
+        for (day, nick), count in sorted(counts.items()):
+            result[name].setdefault(day, {})[nick] = count
+    json.dump(result, out, indent=2, sort_keys=True)
+    out.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m minilodon.logstats',
+                                     description='Statistics over channel '
+                                                 'logs.')
+    parser.add_argument('paths', nargs='+', metavar='path')
+    parser.add_argument('-f', '--format', choices=('csv', 'json'),
+                        default='json')
+    parser.add_argument('-r', '--report', choices=REPORTS,
+                        default='messages', help='table to write as CSV')
+    parser.add_argument('-j', '--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    for path in args.paths:
+        if not os.path.exists(path):
+            parser.error("{}: no such file or directory".format(path))
+    stats = collect(args.paths, args.workers)
+    if args.format == 'csv':
+        write_csv(stats, args.report, sys.stdout)
+    else:
+        write_json(stats, sys.stdout)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+from threading import Thread
+import os
+import queue
+import time
+
+from minilodon import metrics, util
+
+FLUSHES = metrics.REGISTRY.histogram('minilodon_log_flush_seconds',
+                                     'Time spent flushing log files.')
+
+class Clock(object):
+    '''Formats log timestamps, redoing only the parts that changed.
+
+    The date is formatted when a timestamp falls outside the current local
+    day, which is detected by comparing against the epoch of the next
+    midnight; the time of day is formatted once per second.
+    '''
+    def __init__(self):
+        self.midnight = 0
+        self.next_midnight = 0
+        self.date = None
+        self.datestr = ''
+        self.second = None
+        self.timestr = ''
+
+    def format(self, timestamp):
+        second = int(timestamp)
+        if second == self.second:
+            return self.timestr
+        if not self.midnight <= timestamp < self.next_midnight:
+            self.rollover(timestamp)
+        tm = time.localtime(second)
+        self.second = second
+        self.timestr = "{} {:02d}:{:02d}:{:02d}".format(
+            self.datestr, tm.tm_hour, tm.tm_min, tm.tm_sec)
+        return self.timestr
+
+    def rollover(self, timestamp):
+        date = datetime.fromtimestamp(timestamp).replace(
+            hour=0, minute=0, second=0, microsecond=0)
+        self.date = date
+        self.datestr = date.strftime("%d-%m-%y")
+        self.midnight = date.timestamp()
+        self.next_midnight = (date + timedelta(days=1)).timestamp()
+
+class LogWriter(Thread):
+    '''Writes channel logs from a background thread.
+
+    Handlers only enqueue records; the writer formats them, lets the file
+    buffer batch the writes and flushes once `batch_size` lines are pending
+    or `flush_interval` seconds have passed. Files are rotated when a record
+    belongs to a new day. With `fsync` set, files are synced to disk before
+    being rotated or closed.
+    '''
+    def __init__(self, flush_interval=1.0, batch_size=100, fsync=False,
+                 directory='', archive=None, rotator=None):
+        Thread.__init__(self)
+        self.directory = directory
+        self.archive = archive
+        self.rotator = rotator
+        self.daemon = True
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.queue = queue.Queue()
+        self.files = {}
+        self.pending = 0
+        self.deadline = None
+        self.clock = Clock()
+
+    def write(self, channel, msg, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        self.queue.put(('write', channel, timestamp, msg))
+
+    def close(self, channel):
+        self.queue.put(('close', channel, None, None))
+
+    def stop(self):
+        self.queue.put(None)
+        if self.is_alive():
+            self.join()
+        else:
+            self.drain()
+
+    def run(self):
+        while True:
+            if self.deadline is None:
+                timeout = None
+            else:
+                timeout = max(self.deadline - time.time(), 0)
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self.flush()
+                continue
+            if record is None:
+                self.shutdown()
+                return
+            self.handle(record)
+
+    def drain(self):
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                break
+            self.handle(record)
+        self.shutdown()
+
+    def handle(self, record):
+        action, channel, timestamp, msg = record
+        if action == 'close':
+            self.close_file(channel)
+            return
+        timestr = self.clock.format(timestamp)
+        logfile = self.files.get(channel)
+        if logfile is None or logfile.midnight != self.clock.midnight:
+            if logfile is not None:
+                self.close_file(channel)
+                if self.rotator is not None:
+                    self.rotator.rotate(channel)
+            logfile = util.open_log_file(channel, -1, self.clock.date,
+                                         self.directory)
+            logfile.offset = os.fstat(logfile.fileno()).st_size
+            logfile.midnight = self.clock.midnight
+            self.files[channel] = logfile
+        line = "{0} {1}\n".format(timestr, msg)
+        logfile.write(line)
+        if self.archive is not None:
+            self.archive.add(logfile.name, logfile.offset, line)
+            logfile.offset += len(line.encode(logfile.encoding, 'replace'))
+        self.pending += 1
+        if self.deadline is None:
+            self.deadline = time.time() + self.flush_interval
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        start = time.perf_counter()
+        for logfile in self.files.values():
+            logfile.flush()
+        FLUSHES.observe(time.perf_counter() - start)
+        self.pending = 0
+        self.deadline = None
+
+    def close_file(self, channel):
+        logfile = self.files.pop(channel, None)
+        if logfile is None:
+            return
+        logfile.flush()
+        if self.fsync:
+            os.fsync(logfile.fileno())
+        logfile.close()
+        if self.archive is not None:
+            self.archive.close(logfile.name)
+
+    def shutdown(self):
+        for channel in list(self.files):
+            self.close_file(channel)
+        self.pending = 0
+        self.deadline = None
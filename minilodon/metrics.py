@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+import bisect
+
+from minilodon import util
+
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0,
+           15.0)
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(key, str(value)
+                                            .replace('\\', '\\\\')
+                                            .replace('"', '\\"'))
+                          for key, value in labels) + '}'
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter(object):
+    kind = 'counter'
+
+    def __init__(self, name, doc):
+        self.name = name
+        self.doc = doc
+        self.values = {}
+        self.lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value)
+                    for key, value in self.values.items()]
+
+class Histogram(object):
+    kind = 'histogram'
+
+    def __init__(self, name, doc, buckets=BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.buckets = buckets
+        self.values = {}
+        self.lock = Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) \
+                                            + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def samples(self):
+        result = []
+        with self.lock:
+            values = [(key, list(counts))
+                      for key, counts in self.values.items()]
+        for key, counts in values:
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                total += count
+                result.append((self.name + '_bucket',
+                               key + (('le', format_value(bound)),), total))
+            result.append((self.name + '_sum', key, counts[-1]))
+            result.append((self.name + '_count', key, total))
+        return result
+
+class Registry(object):
+    '''Counters and histograms rendered in the Prometheus text format.
+
+    Values that are already kept elsewhere, such as queue lengths, are read
+    at render time from collectors: callables yielding (name, labels, value)
+    tuples.
+    '''
+    def __init__(self):
+        self.metrics = OrderedDict()
+        self.collectors = []
+
+    def counter(self, name, doc):
+        return self.metrics.setdefault(name, Counter(name, doc))
+
+    def histogram(self, name, doc, buckets=BUCKETS):
+        return self.metrics.setdefault(name, Histogram(name, doc, buckets))
+
+    def register(self, collector):
+        self.collectors.append(collector)
+
+    def unregister(self, collector):
+        self.collectors.remove(collector)
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append('# HELP {} {}'.format(metric.name, metric.doc))
+            lines.append('# TYPE {} {}'.format(metric.name, metric.kind))
+            for name, key, value in metric.samples():
+                lines.append('{}{} {}'.format(name, format_labels(key),
+                                              format_value(value)))
+        collected = OrderedDict()
+        for collector in list(self.collectors):
+            for name, labels, value in collector():
+                key = tuple(sorted(labels.items()))
+                collected.setdefault(name, []).append((key, value))
+        for name, samples in collected.items():
+            kind = 'counter' if name.endswith('_total') else 'gauge'
+            lines.append('# TYPE {} {}'.format(name, kind))
+            for key, value in samples:
+                lines.append('{}{} {}'.format(name, format_labels(key),
+                                              format_value(value)))
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+def serve(port, host='127.0.0.1', registry=REGISTRY):
+    server = MetricsServer((host, port), MetricsHandler)
+    server.registry = registry
+    thread = Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def dump(filename, registry=REGISTRY):
+    util.write_atomic(filename, registry.render())
@@ -1,319 +1,557 @@
-from datetime import datetime
-import json
-import logging
-import irc.bot
-import irc.client
-from jaraco.stream import buffer
-
-from minilodon import util
-from minilodon.kicker import Kicker
-
-class Minilodon(irc.bot.SingleServerIRCBot):
-    def __init__(self, config):
-        with open(config) as f:
-            config = json.load(f)
-        server = config['server']
-        port = config['port']
-        nickname = config['nick']
-        irc.bot.SingleServerIRCBot.__init__(self, [(server, port)], nickname,
-                                            nickname)
-        irc.client.ServerConnection.buffer_class = buffer.LenientDecodingLineBuffer
-        self.channel = config['mainchannel'].lower()
-        self.control_channel = config['controlchannel'].lower()
-        self.password = config['password'] if 'password' in config else None
-        self.idletime = config['idletime'] if 'idletime' in config else 3600.0
-        self.on_message = []
-        self.extrachannels = []
-        self.logs = {}
-        self.kickers = {}
-        self.commands = {}
-        self.control_commands = {}
-        self.alone = ''
-        self.logger = logging.getLogger(__name__)
-
-    def on_nicknameinuse(self, c, e):
-        c.nick(c.get_nickname() + "_")
-
-    def on_disconnect(self, c, e):
-        raise Exception("Disconnected by {} ({})"
-                        .format(e.source, " ".join(e.arguments)))
-
-    def on_welcome(self, c, e):
-        c.mode(c.get_nickname(), "-g")
-        if self.password:
-            self.send_priv_msg('NickServ', 'IDENTIFY ' + self.password)
-        else:
-            c.join(self.control_channel)
-            c.join(self.channel)
-
-    def on_privnotice(self, c, e):
-        if (e.source.nick == "NickServ" and e.arguments[0] ==
-                "Password accepted - you are now recognized."):
-            c.join(self.control_channel)
-            c.join(self.channel)
-
-    def on_pubmsg(self, c, e):
-        channel = e.target.lower()
-        line = "<{0}> {1}".format(e.source.nick, " ".join(e.arguments))
-        self.log(channel, line)
-        if channel == self.channel:
-            self.on_pubmsg_main(e)
-        elif channel == self.control_channel:
-            self.on_pubmsg_control(e)
-
-    def on_pubmsg_main(self, e):
-        nick = e.source.nick
-        if not nick.lower() in self.kickers:
-            self.add_kicker(nick)
-        else:
-            self.kickers[nick.lower()].reset()
-        if e.arguments[0].startswith("!"):
-            self.send_msg(self.do_command(e, e.arguments[0][1:]))
-        msg = " ".join(e.arguments)
-        if self.on_message:
-            for f in self.on_message:
-                result = f(nick, msg)
-                self.send_msg(result)
-
-    def on_pubmsg_control(self, e):
-        if e.arguments[0].startswith("!"):
-            self.send_msg(self.do_control_command(e, e.arguments[0][1:]), True)
-            self.send_msg(self.do_command(e, e.arguments[0][1:]), True)
-
-    def on_action(self, c, e):
-        self.log(e.target, "{} {}".format(e.source.nick,
-                                          " ".join(e.arguments)))
-        if e.target.lower() == self.channel:
-            e.arguments = ["/me"] + e.arguments
-            self.on_pubmsg_main(e)
-
-    def on_join(self, c, e):
-        channel = e.target.lower()
-        if e.source.nick == self.connection.get_nickname():
-            self.logs[channel] = util.open_log_file(channel)
-            self.send_msg("Joined {}".format(channel), True)
-        else:
-            host = e.source.split('!')[1]
-            nick = e.source.nick
-            self.log(e.target, "{} [{}] joined {}".format(nick, host, channel))
-            if channel != self.channel:
-                return
-            if self.alone:
-                self.add_kicker(self.alone)
-                self.alone = ''
-            users = [user for user in self.channels[self.channel].users()
-                     if user.lower() not in ['chanserv',
-                                             c.get_nickname().lower()]]
-            if len(users) == 1:
-                self.alone = users[0]
-            else:
-                self.add_kicker(nick)
-
-    def on_namreply(self, c, e):
-        channel = e.arguments[1].lower()
-        if channel == self.channel:
-            users = [user.strip('@%+') for user in e.arguments[2].strip()
-                                                                 .split(' ')
-                     if user.strip('@%+').lower() not in ['chanserv',
-                                                          c.get_nickname()
-                                                           .lower()]]
-            if len(users) == 1:
-                self.alone = users[0]
-            else:
-                for user in users:
-                    self.add_kicker(user)
-
-    def on_bannedfromchan(self, c, e):
-        channel = e.arguments[0]
-        self.send_msg("Failed to join channel {}".format(channel), True)
-        if channel in self.extrachannels:
-            self.extrachannels.remove(channel)
-
-    def on_part(self, c, e):
-        channel = e.target.lower()
-        if e.source.nick == self.connection.get_nickname():
-            self.send_msg("Left {}".format(channel), True)
-            self.logs[channel].close()
-            del self.logs[channel]
-            return
-        self.on_leave(e.source.nick)
-        self.log(channel, "{} left {}".format(e.source.nick, channel))
-
-    def on_leave(self, nick):
-        if self.alone:
-            self.alone = ''
-        users = [user for user in self.channels[self.channel].users()
-                 if user.lower() not in ['chanserv',
-                                         self.connection.get_nickname().lower()]]
-        if len(users) == 1:
-            self.alone = users[0]
-            self.remove_kicker(self.alone)
-        self.remove_kicker(nick)
-
-    def on_quit(self, c, e):
-        self.on_leave(e.source.nick)
-        self.log(self.channel, "{} quit".format(e.source.nick))
-
-    def on_kick(self, c, e):
-        channel = e.target.lower()
-        kicker = e.source.nick
-        kickee = e.arguments[0]
-        reason = " ".join(e.arguments[1:])
-        if kickee == self.connection.get_nickname():
-            if channel == self.channel or channel == self.control_channel:
-                raise Exception("Kicked from {} by {} ({})"
-                                .format(channel, kicker, reason))
-            else:
-                self.send_msg("Kicked from {} by {} ({})"
-                              .format(channel, kicker, reason), True)
-                self.logs[e.target].close()
-                del self.logs[e.target]
-                self.extrachannels.remove(channel)
-        else:
-            if channel == self.channel:
-                self.on_leave(kickee)
-            self.log(channel,
-                     "{} was kicked from {} by {} ({})".format(kickee, channel,
-                                                               kicker, reason))
-
-    def join(self, target):
-        channel = target.lower()
-        if channel == self.channel or channel == self.control_channel:
-            return
-        if channel in self.extrachannels:
-            return
-        self.extrachannels.append(channel)
-        self.connection.join(channel)
-
-    def part(self, target):
-        channel = target.lower()
-        if not channel in self.extrachannels:
-            self.send_msg("Channel {} never joined via !join"
-                          .format(channel), True)
-            return
-        self.extrachannels.remove(channel)
-        self.connection.part(channel)
-
-    def add_kicker(self, nick):
-        if nick == self.connection.get_nickname() or nick == "ChanServ":
-            return
-        if not nick.lower() in self.kickers:
-            kicker = Kicker(self, self.channel, nick, self.idletime)
-            kicker.start()
-            self.kickers[nick.lower()] = kicker
-
-    def remove_kicker(self, nick):
-        nick = nick.lower()
-        if nick in self.kickers:
-            self.kickers[nick].cancel()
-            del self.kickers[nick]
-
-    def get_idle_times(self):
-        for nick in self.kickers:
-            yield (self.kickers[nick].nick, self.kickers[nick].time)
-
-    def on_nick(self, c, e):
-        old = e.source.nick
-        new = e.target
-        if old.lower() in self.kickers:
-            self.kickers[old.lower()].changenick(new)
-            if old.lower() != new.lower():
-                self.kickers[new.lower()] = self.kickers[old.lower()]
-                del self.kickers[old.lower()]
-
-    def on_privmsg(self, c, e):
-        command = e.arguments[0][1:]
-        result = self.do_command(e, command)
-        self.send_priv_msg(e.source.nick, result)
-
-    def do_command(self, e, cmd):
-        nick = e.source.nick
-        args = cmd.split(" ")
-        if args[0] in self.commands:
-            return self.commands[args[0]](nick, args)
-
-    def do_control_command(self, e, cmd):
-        args = cmd.split(" ")
-        nick = e.source.nick
-        if args[0] in self.control_commands:
-            return self.control_commands[args[0]](nick, args)
-
-    def kick(self, nick, reason):
-        self.connection.kick(self.channel, nick, reason)
-
-    def log(self, chan, msg):
-        channel = chan.lower()
-        if channel not in self.logs:
-            self.logger.warning(
-                "Message received on channel %s before join: %s", channel, msg)
-            return
-        logfile = self.logs[channel]
-        curtime = datetime.now()
-        if not curtime.day == logfile.day:
-            self.reopen_logs()
-            logfile = self.logs[channel]
-        timestr = curtime.strftime("%d-%m-%y %H:%M:%S")
-        line = "{0} {1}\n".format(timestr, msg)
-        logfile.write(line)
-
-    def reopen_logs(self):
-        for channel in self.logs:
-            oldfile = self.logs[channel]
-            self.logs[channel] = util.open_log_file(channel)
-            oldfile.close()
-
-    def send_msg(self, msg, control=False):
-        if msg is None:
-            return
-        if not isinstance(msg, str):
-            for line in msg:
-                self.send_msg(line, control)
-            return
-        if len(msg) > 254:
-            return self.send_msg(util.wrap_msg(msg), control)
-        channel = self.control_channel if control else self.channel
-        if msg[:3] == '/me':
-            return self.send_action(msg[4:], control)
-        self.connection.privmsg(channel, msg)
-        mynick = self.connection.get_nickname()
-        line = "<{0}> {1}".format(mynick, msg)
-        self.log(channel, line)
-
-    def send_priv_msg(self, target, msg):
-        if msg is None or target.startswith("#"):
-            return
-        if not isinstance(msg, str):
-            for line in msg:
-                self.send_priv_msg(target, line)
-            return
-        if len(msg) > 254:
-            return self.send_priv_msg(target, util.wrap_msg(msg))
-        if msg[:3] == '/me':
-            return self.send_priv_action(target, msg[4:])
-        self.connection.privmsg(target, msg)
-
-    def send_action(self, action, control=False):
-        if action is None:
-            return
-        channel = self.control_channel if control else self.channel
-        self.connection.action(channel, action)
-        line = "{} {}".format(self.connection.get_nickname(), action)
-        self.log(channel, line)
-
-    def send_priv_action(self, target, action):
-        self.connection.action(target, action)
-
-    def message(self):
-        def decorator(f):
-            self.on_message.append(f)
-            return f
-        return decorator
-
-    def command(self, cmd, control=False):
-        def decorator(f):
-            if control:
-                self.control_commands[cmd] = f
-            else:
-                self.commands[cmd] = f
-            return f
-        return decorator
+from threading import Thread
+import asyncio
+import inspect
+import json
+import logging
+import random
+import time
+import irc.bot
+import irc.client
+from jaraco.stream import buffer
+
+from minilodon import metrics, util
+from minilodon.archive import Archive
+from minilodon.burst import Burst
+from minilodon.kicker import IdleTracker, load_snapshot, save_snapshot
+from minilodon.logwriter import LogWriter
+from minilodon.outbound import Outbound, HIGH
+from minilodon.profiler import PROFILER, size
+from minilodon.roster import Roster
+from minilodon.rotation import Rotator
+from minilodon.router import CommandRouter
+
+EVENTS = metrics.REGISTRY.histogram('minilodon_event_seconds',
+                                    'Time spent handling IRC events.')
+SENT = metrics.REGISTRY.counter('minilodon_messages_sent_total',
+                                'Channel messages queued for sending.')
+LOGGED = metrics.REGISTRY.histogram('minilodon_log_seconds',
+                                    'Time spent queueing a log line.')
+KICKS = metrics.REGISTRY.counter('minilodon_kicks_total', 'Users kicked.')
+
+class Minilodon(irc.bot.SingleServerIRCBot):
+    @classmethod
+    def create(cls, filename):
+        with open(filename) as f:
+            config = json.load(f)
+        if isinstance(config, list):
+            from minilodon.group import BotGroup
+            # Each bot logs to its own directory unless told otherwise, so
+            # equally named channels do not share a log file.
+            return BotGroup([cls.create_one(dict({'logdir': '{}-{}'.format(
+                item['server'], item['nick'])}, **item)) for item in config])
+        return cls.create_one(config)
+
+    @classmethod
+    def create_one(cls, config):
+        if config.get('asyncio', False):
+            from minilodon.aio import AsyncMinilodon
+            return AsyncMinilodon(config)
+        return cls(config)
+
+    def __init__(self, config):
+        if not isinstance(config, dict):
+            with open(config) as f:
+                config = json.load(f)
+        self.config = config
+        self.group = None
+        server = config['server']
+        self.network = server
+        port = config['port']
+        nickname = config['nick']
+        irc.bot.SingleServerIRCBot.__init__(self, [(server, port)], nickname,
+                                            nickname)
+        irc.client.ServerConnection.buffer_class = buffer.LenientDecodingLineBuffer
+        self.channel = config['mainchannel'].lower()
+        self.control_channel = config['controlchannel'].lower()
+        self.password = config['password'] if 'password' in config else None
+        self.idletime = config['idletime'] if 'idletime' in config else 3600.0
+        self.recon = self.backoff()
+        self.rejoins = {}
+        self.names = None
+        self.on_message = []
+        self.extrachannels = []
+        self.logs = set()
+        self.archive = None
+        if config.get('logindex', False):
+            self.archive = Archive(config.get('logdir', ''),
+                                   config.get('logtokens', False))
+        self.rotator = None
+        if 'lograw' in config:
+            self.rotator = Rotator(config.get('logdir', ''), config['lograw'],
+                                   config.get('logcompressed'))
+        self.logwriter = LogWriter(config.get('logflush', 1000) / 1000.0,
+                                   fsync=config.get('logfsync', False),
+                                   directory=config.get('logdir', ''),
+                                   archive=self.archive,
+                                   rotator=self.rotator)
+        self.kickers = {}
+        self.idle = IdleTracker(self, self.idletime)
+        self.idlestate = config.get('idlestate')
+        self.restored = {}
+        if self.idlestate:
+            self.restored = load_snapshot(self.idlestate)
+        self.outbound = Outbound(self, config.get('floodrate', 0.5),
+                                 config.get('floodburst', 5),
+                                 config.get('floodqueue', 20))
+        self.roster = Roster(nickname)
+        self.burst = Burst(self, config.get('burstwindow', 1.0))
+        self.commands = CommandRouter()
+        self.control_commands = CommandRouter()
+        self.alone = ''
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def current(self):
+        return self
+
+    def _dispatcher(self, connection, event):
+        if self.group is not None:
+            self.group.current = self
+        start = time.perf_counter()
+        PROFILER.run(event.type, size(event.arguments),
+                     irc.bot.SingleServerIRCBot._dispatcher, self,
+                     connection, event)
+        EVENTS.observe(time.perf_counter() - start, event=event.type)
+
+    def on_nicknameinuse(self, c, e):
+        c.nick(c.get_nickname() + "_")
+
+    def backoff(self):
+        return irc.bot.ExponentialBackoff(
+            min_interval=self.config.get('reconnectmin', 5),
+            max_interval=self.config.get('reconnectmax', 300))
+
+    def on_disconnect(self, c, e):
+        self.logger.warning("Disconnected by %s (%s), reconnecting",
+                            e.source, " ".join(e.arguments))
+        self.idle.pause()
+
+    def on_welcome(self, c, e):
+        self.recon = self.backoff()
+        self.rejoins = {}
+        self.roster.setnick(c.get_nickname())
+        c.mode(c.get_nickname(), "-g")
+        if self.password:
+            self.send_priv_msg('NickServ', 'IDENTIFY ' + self.password)
+        else:
+            self.join_channels(c)
+
+    def on_privnotice(self, c, e):
+        if (e.source.nick == "NickServ" and e.arguments[0] ==
+                "Password accepted - you are now recognized."):
+            self.join_channels(c)
+
+    def join_channels(self, c):
+        c.join(self.control_channel)
+        c.join(self.channel)
+        for channel in self.extrachannels:
+            c.join(channel)
+
+    def on_pubmsg(self, c, e):
+        channel = e.target.lower()
+        line = "<{0}> {1}".format(e.source.nick, " ".join(e.arguments))
+        self.log(channel, line)
+        if channel == self.channel:
+            self.on_pubmsg_main(e)
+        elif channel == self.control_channel:
+            self.on_pubmsg_control(e)
+
+    def on_pubmsg_main(self, e):
+        nick = e.source.nick
+        if not nick.lower() in self.kickers:
+            self.add_kicker(nick)
+        else:
+            self.kickers[nick.lower()].reset()
+        if e.arguments[0].startswith("!"):
+            self.send_msg(self.do_command(e, e.arguments[0][1:]))
+        msg = " ".join(e.arguments)
+        if self.on_message:
+            for f in self.on_message:
+                result = PROFILER.run(getattr(f, '__name__', 'message'),
+                                      len(msg), f, nick, msg)
+                self.send_msg(result)
+
+    def on_pubmsg_control(self, e):
+        if e.arguments[0].startswith("!"):
+            self.send_msg(self.do_control_command(e, e.arguments[0][1:]), True)
+            self.send_msg(self.do_command(e, e.arguments[0][1:]), True)
+
+    def on_action(self, c, e):
+        self.log(e.target, "{} {}".format(e.source.nick,
+                                          " ".join(e.arguments)))
+        if e.target.lower() == self.channel:
+            e.arguments = ["/me"] + e.arguments
+            self.on_pubmsg_main(e)
+
+    def on_join(self, c, e):
+        channel = e.target.lower()
+        if e.source.nick == self.connection.get_nickname():
+            self.logs.add(channel)
+            self.rejoins.pop(channel, None)
+            if channel == self.channel:
+                self.names = set()
+            self.send_msg("Joined {}".format(channel), True)
+        else:
+            host = e.source.split('!')[1]
+            nick = e.source.nick
+            line = "{} [{}] joined {}".format(nick, host, channel)
+            if channel != self.channel:
+                self.log(e.target, line)
+                return
+            if self.burst.add(('join', nick, host)):
+                return
+            self.log(e.target, line)
+            if self.alone:
+                self.add_kicker(self.alone)
+                self.alone = ''
+            self.roster.add(nick)
+            alone = self.roster.alone()
+            if alone:
+                self.alone = alone
+            else:
+                self.add_kicker(nick)
+
+    def on_namreply(self, c, e):
+        channel = e.arguments[1].lower()
+        if channel != self.channel:
+            return
+        self.burst.flush()
+        users = [user.lstrip('@%+~&') for user in e.arguments[2].split()]
+        for user in users:
+            self.roster.add(user)
+        if self.names is not None:
+            self.names.update(user.lower() for user in users)
+        alone = self.roster.alone()
+        if alone:
+            self.alone = alone
+            return
+        if self.alone:
+            self.add_kicker(self.alone)
+            self.alone = ''
+        for user in users:
+            self.add_kicker(user)
+
+    def on_endofnames(self, c, e):
+        channel = e.arguments[0].lower()
+        if channel != self.channel or self.names is None:
+            return
+        for nick in self.roster:
+            if nick.lower() not in self.names:
+                self.on_leave(nick)
+        self.names = None
+        if self.restored:
+            self.idle.restore(self.restored)
+            self.restored = {}
+        self.idle.resume()
+
+    def on_bannedfromchan(self, c, e):
+        channel = e.arguments[0]
+        self.send_msg("Failed to join channel {}".format(channel), True)
+        if channel.lower() in (self.channel, self.control_channel):
+            self.rejoin(channel.lower())
+            return
+        if channel in self.extrachannels:
+            self.extrachannels.remove(channel)
+
+    def on_part(self, c, e):
+        self.burst.flush()
+        channel = e.target.lower()
+        if e.source.nick == self.connection.get_nickname():
+            self.send_msg("Left {}".format(channel), True)
+            self.close_log(channel)
+            return
+        if channel == self.channel:
+            self.on_leave(e.source.nick)
+        self.log(channel, "{} left {}".format(e.source.nick, channel))
+
+    def on_leave(self, nick):
+        if self.alone:
+            self.alone = ''
+        self.roster.remove(nick)
+        alone = self.roster.alone()
+        if alone:
+            self.alone = alone
+            self.remove_kicker(self.alone)
+        self.remove_kicker(nick)
+
+    def on_quit(self, c, e):
+        if self.burst.add(('quit', e.source.nick)):
+            return
+        self.on_leave(e.source.nick)
+        self.log(self.channel, "{} quit".format(e.source.nick))
+
+    def on_burst(self, events):
+        joined = []
+        quit = []
+        for event in events:
+            if event[0] == 'join':
+                self.roster.add(event[1])
+                joined.append(event)
+            else:
+                self.roster.remove(event[1])
+                self.remove_kicker(event[1])
+                quit.append(event[1])
+        if len(joined) == 1:
+            self.log(self.channel, "{} [{}] joined {}"
+                     .format(joined[0][1], joined[0][2], self.channel))
+        elif joined:
+            self.log(self.channel, "{} users joined {}: {}"
+                     .format(len(joined), self.channel,
+                             " ".join(event[1] for event in joined)))
+        if len(quit) == 1:
+            self.log(self.channel, "{} quit".format(quit[0]))
+        elif quit:
+            self.log(self.channel, "{} users quit: {}"
+                     .format(len(quit), " ".join(quit)))
+        alone = self.roster.alone()
+        if self.alone and self.alone != alone and self.alone in self.roster:
+            self.add_kicker(self.alone)
+        self.alone = alone
+        if alone:
+            self.remove_kicker(alone)
+            return
+        for event in joined:
+            if event[1] in self.roster:
+                self.add_kicker(event[1])
+
+    def on_kick(self, c, e):
+        self.burst.flush()
+        channel = e.target.lower()
+        kicker = e.source.nick
+        kickee = e.arguments[0]
+        reason = " ".join(e.arguments[1:])
+        if kickee == self.connection.get_nickname():
+            if channel == self.channel or channel == self.control_channel:
+                self.log(channel, "Kicked from {} by {} ({})"
+                         .format(channel, kicker, reason))
+                if channel == self.channel:
+                    self.idle.pause()
+                    self.send_msg("Kicked from {} by {} ({})"
+                                  .format(channel, kicker, reason), True)
+                self.rejoin(channel)
+            else:
+                self.send_msg("Kicked from {} by {} ({})"
+                              .format(channel, kicker, reason), True)
+                self.close_log(channel)
+                self.extrachannels.remove(channel)
+        else:
+            if channel == self.channel:
+                self.on_leave(kickee)
+            self.log(channel,
+                     "{} was kicked from {} by {} ({})".format(kickee, channel,
+                                                               kicker, reason))
+
+    def rejoin(self, channel):
+        attempt = self.rejoins.get(channel, 0) + 1
+        self.rejoins[channel] = attempt
+        delay = min(2 ** attempt, self.recon.max_interval)
+        delay *= random.uniform(0.5, 1.0)
+        self.reactor.scheduler.execute_after(
+            delay, lambda: self.do_rejoin(channel))
+
+    def do_rejoin(self, channel):
+        if self.connection.is_connected():
+            self.connection.join(channel)
+
+    def join(self, target):
+        channel = target.lower()
+        if channel == self.channel or channel == self.control_channel:
+            return
+        if channel in self.extrachannels:
+            return
+        self.extrachannels.append(channel)
+        self.connection.join(channel)
+
+    def part(self, target):
+        channel = target.lower()
+        if not channel in self.extrachannels:
+            self.send_msg("Channel {} never joined via !join"
+                          .format(channel), True)
+            return
+        self.extrachannels.remove(channel)
+        self.connection.part(channel)
+
+    def add_kicker(self, nick):
+        if self.roster.is_ignored(nick):
+            return
+        if not nick.lower() in self.kickers:
+            self.kickers[nick.lower()] = self.idle.add(nick)
+
+    def remove_kicker(self, nick):
+        nick = nick.lower()
+        if nick in self.kickers:
+            self.kickers[nick].cancel()
+            del self.kickers[nick]
+
+    def get_idle_times(self):
+        for nick in self.kickers:
+            yield (self.kickers[nick].nick, self.kickers[nick].time)
+
+    def on_nick(self, c, e):
+        self.burst.flush()
+        old = e.source.nick
+        new = e.target
+        self.roster.rename(old, new)
+        if old.lower() in self.kickers:
+            self.kickers[old.lower()].changenick(new)
+            if old.lower() != new.lower():
+                self.kickers[new.lower()] = self.kickers[old.lower()]
+                del self.kickers[old.lower()]
+
+    def on_privmsg(self, c, e):
+        command = e.arguments[0][1:]
+        result = self.do_command(e, command)
+        self.send_priv_msg(e.source.nick, result)
+
+    def do_command(self, e, cmd):
+        return self.commands.dispatch(e.source.nick, cmd)
+
+    def do_control_command(self, e, cmd):
+        return self.control_commands.dispatch(e.source.nick, cmd)
+
+    def kick(self, nick, reason, notice=None):
+        KICKS.inc(network=self.network)
+        self.outbound.send('kick', (self.channel, nick, reason), priority=HIGH)
+        if notice is not None:
+            SENT.inc(network=self.network)
+            line = "<{0}> {1}".format(self.connection.get_nickname(), notice)
+            self.outbound.send('privmsg', (self.control_channel, notice),
+                               (self.control_channel, line), priority=HIGH)
+
+    def log(self, chan, msg):
+        start = time.perf_counter()
+        channel = chan.lower()
+        if channel not in self.logs:
+            self.logger.warning(
+                "Message received on channel %s before join: %s", channel, msg)
+            return
+        self.logwriter.write(channel, msg)
+        LOGGED.observe(time.perf_counter() - start)
+
+    def close_log(self, channel):
+        self.logs.discard(channel)
+        self.logwriter.close(channel)
+
+    def save_idle(self):
+        # Until the snapshot loaded at startup has been applied, the tracker
+        # only holds fresh join times and saving would overwrite it.
+        if self.idlestate and not self.restored:
+            save_snapshot(self.idlestate, self.idle.snapshot())
+
+    def collect(self):
+        labels = {'network': self.network}
+        yield 'minilodon_kickers', labels, len(self.idle)
+        yield 'minilodon_roster_users', labels, len(self.roster)
+        yield 'minilodon_outbound_queued', labels, len(self.outbound)
+        yield ('minilodon_outbound_coalesced_total', labels,
+               self.outbound.coalesced)
+        yield ('minilodon_outbound_dropped_total', labels,
+               self.outbound.dropped)
+        yield 'minilodon_bursts_total', labels, self.burst.bursts
+        yield 'minilodon_burst_largest', labels, self.burst.largest
+        yield 'minilodon_burst_longest_seconds', labels, self.burst.longest
+        yield 'minilodon_log_queued', labels, self.logwriter.queue.qsize()
+
+    def prepare(self):
+        self.logwriter.start()
+        if self.rotator is not None:
+            self.rotator.start()
+            self.rotator.rotate_all()
+        metrics.REGISTRY.register(self.collect)
+        if self.idlestate:
+            self.reactor.scheduler.execute_every(
+                self.config.get('idlesnapshot', 60.0), self.save_idle)
+
+    def start(self):
+        self.prepare()
+        irc.bot.SingleServerIRCBot.start(self)
+
+    def die(self, msg="Bye, cruel world!"):
+        self.logwriter.stop()
+        if self.rotator is not None:
+            self.rotator.stop()
+        self.save_idle()
+        irc.bot.SingleServerIRCBot.die(self, msg)
+
+    def call_soon(self, func, *args):
+        with self.reactor.mutex:
+            self.reactor.scheduler.execute_after(0, lambda: func(*args))
+
+    def run_async(self, awaitable, callback):
+        async def wrap():
+            return await awaitable
+        def run():
+            result = asyncio.run(wrap())
+            self.call_soon(callback, result)
+        thread = Thread(target=run)
+        thread.daemon = True
+        thread.start()
+
+    def send_msg(self, msg, control=False):
+        if msg is None:
+            return
+        if inspect.isawaitable(msg):
+            return self.run_async(msg, lambda result:
+                                  self.send_msg(result, control))
+        if not isinstance(msg, str):
+            for line in msg:
+                self.send_msg(line, control)
+            return
+        channel = self.control_channel if control else self.channel
+        budget = self.budget(channel, msg)
+        if len(msg) > budget // 4 and len(msg.encode('utf-8')) > budget:
+            return self.send_msg(util.wrap_msg(msg, budget), control)
+        if msg[:3] == '/me':
+            return self.send_action(msg[4:], control)
+        SENT.inc(network=self.network)
+        mynick = self.connection.get_nickname()
+        line = "<{0}> {1}".format(mynick, msg)
+        self.outbound.send('privmsg', (channel, msg), (channel, line))
+
+    def budget(self, target, msg):
+        budget = util.payload_budget(target, self.connection.get_nickname())
+        if msg[:3] == '/me':
+            budget -= len('\x01ACTION \x01')
+        return budget
+
+    def send_priv_msg(self, target, msg):
+        if msg is None or target.startswith("#"):
+            return
+        if inspect.isawaitable(msg):
+            return self.run_async(msg, lambda result:
+                                  self.send_priv_msg(target, result))
+        if not isinstance(msg, str):
+            for line in msg:
+                self.send_priv_msg(target, line)
+            return
+        budget = self.budget(target, msg)
+        if len(msg) > budget // 4 and len(msg.encode('utf-8')) > budget:
+            return self.send_priv_msg(target, util.wrap_msg(msg, budget))
+        if msg[:3] == '/me':
+            return self.send_priv_action(target, msg[4:])
+        self.outbound.send('privmsg', (target, msg))
+
+    def send_action(self, action, control=False):
+        if action is None:
+            return
+        channel = self.control_channel if control else self.channel
+        line = "{} {}".format(self.connection.get_nickname(), action)
+        self.outbound.send('action', (channel, action), (channel, line))
+
+    def send_priv_action(self, target, action):
+        self.outbound.send('action', (target, action))
+
+    def message(self):
+        def decorator(f):
+            self.on_message.append(f)
+            return f
+        return decorator
+
+    def command(self, cmd, control=False, aliases=()):
+        def decorator(f):
+            if control:
+                self.control_commands.add(cmd, f, aliases)
+            else:
+                self.commands.add(cmd, f, aliases)
+            return f
+        return decorator
@@ -0,0 +1,111 @@
+from collections import OrderedDict, deque
+import time
+
+import irc.client
+
+HIGH = 0
+NORMAL = 1
+
+class Outbound(object):
+    '''Rate limits everything the bot sends with a token bucket.
+
+    Up to `burst` commands go out immediately, after which tokens refill at
+    `rate` per second. Commands that have to wait are queued per target in
+    one of two priority lanes; targets take turns within a lane and the high
+    lane, meant for kicks, always goes first. In the normal lane each target
+    queues at most `maxqueue` commands and the oldest is dropped to make
+    room; the target is told how many lines were dropped on its next turn.
+    The high lane is never trimmed. A command identical to one that is
+    still queued is dropped. The queue is drained from the reactor's
+    scheduler.
+    '''
+    def __init__(self, bot, rate=0.5, burst=5, maxqueue=20):
+        self.bot = bot
+        self.rate = rate
+        self.burst = burst
+        self.maxqueue = maxqueue
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self.lanes = [OrderedDict(), OrderedDict()]
+        self.queued = set()
+        self.scheduled = False
+        self.coalesced = 0
+        self.dropped = 0
+        self.skipped = {}
+
+    def __len__(self):
+        return len(self.queued)
+
+    def send(self, method, args, log=None, priority=NORMAL):
+        key = (method, args)
+        if key in self.queued:
+            self.coalesced += 1
+            return
+        if not self.queued and self.take():
+            self.deliver(method, args, log)
+            return
+        lane = self.lanes[priority]
+        if args[0] not in lane:
+            lane[args[0]] = deque()
+        queue = lane[args[0]]
+        if priority == NORMAL and len(queue) >= self.maxqueue:
+            old_method, old_args, _ = queue.popleft()
+            self.queued.discard((old_method, old_args))
+            self.dropped += 1
+            self.skipped[args[0]] = self.skipped.get(args[0], 0) + 1
+        queue.append((method, args, log))
+        self.queued.add(key)
+        self.schedule()
+
+    def refill(self):
+        curtime = time.time()
+        self.tokens = min(self.burst,
+                          self.tokens + (curtime - self.updated) * self.rate)
+        self.updated = curtime
+
+    def take(self):
+        self.refill()
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def schedule(self):
+        if self.scheduled:
+            return
+        self.scheduled = True
+        delay = max((1 - self.tokens) / self.rate, 0)
+        self.bot.reactor.scheduler.execute_after(delay, self.pump)
+
+    def pump(self):
+        self.scheduled = False
+        while self.queued and self.take():
+            method, args, log = self.pop()
+            self.queued.discard((method, args))
+            self.deliver(method, args, log)
+        if self.queued:
+            self.schedule()
+
+    def pop(self):
+        for priority, lane in enumerate(self.lanes):
+            if not lane:
+                continue
+            target, queue = next(iter(lane.items()))
+            if priority == NORMAL and target in self.skipped:
+                lane.move_to_end(target)
+                return ('privmsg', (target, "Dropped {} queued lines.".format(
+                    self.skipped.pop(target))), None)
+            item = queue.popleft()
+            if queue:
+                lane.move_to_end(target)
+            else:
+                del lane[target]
+            return item
+
+    def deliver(self, method, args, log):
+        try:
+            getattr(self.bot.connection, method)(*args)
+        except irc.client.ServerNotConnectedError:
+            return
+        if log is not None:
+            self.bot.log(*log)
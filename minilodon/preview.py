@@ -0,0 +1,74 @@
+from collections import deque
+from threading import Condition, Thread
+import logging
+import time
+
+class Previewer(object):
+    '''Runs link previews on a small pool of worker threads.
+
+    At most `maxqueue` requests wait for a worker; when a burst of links
+    overflows the queue the oldest request is dropped. Requests that waited
+    or ran longer than `timeout` seconds are discarded instead of being
+    posted late. Workers are started on the first submitted request.
+    '''
+    def __init__(self, fetch, workers=2, maxqueue=8, timeout=15.0):
+        self.fetch = fetch
+        self.workers = workers
+        self.maxqueue = maxqueue
+        self.timeout = timeout
+        self.requests = deque()
+        self.condition = Condition()
+        self.threads = []
+        self.dropped = 0
+        self.expired = 0
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, url, callback):
+        self.submit_all([url], callback)
+
+    def submit_all(self, urls, callback):
+        with self.condition:
+            if not self.threads:
+                self.start()
+            deadline = time.time() + self.timeout
+            for url in urls:
+                if len(self.requests) >= self.maxqueue:
+                    self.requests.popleft()
+                    self.dropped += 1
+                self.requests.append((url, callback, deadline))
+            self.condition.notify(len(urls))
+
+    def warm(self, func):
+        thread = Thread(target=func)
+        thread.daemon = True
+        thread.start()
+
+    def start(self):
+        for _ in range(self.workers):
+            thread = Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def work(self):
+        while True:
+            with self.condition:
+                while not self.requests:
+                    self.condition.wait()
+                url, callback, deadline = self.requests.popleft()
+            self.run(url, callback, deadline)
+
+    def run(self, url, callback, deadline):
+        if time.time() > deadline:
+            self.expired += 1
+            return
+        try:
+            result = self.fetch(url)
+        except Exception:
+            self.logger.exception("Preview of %s failed", url)
+            return
+        if time.time() > deadline:
+            self.expired += 1
+            return
+        if result is not None:
+            callback(result)
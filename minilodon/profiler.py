@@ -0,0 +1,86 @@
+from threading import Lock
+import cProfile
+import heapq
+import itertools
+import logging
+import pstats
+import time
+
+class Profiler(object):
+    '''Opt-in timing of IRC events, commands, message handlers and previews.
+
+    While enabled, every call passed through `run` is timed and calls slower
+    than `threshold` seconds are logged with their argument size. With
+    `samples` set, the outermost call on one thread at a time also runs under
+    cProfile and the `samples` slowest profiles are kept for `dump`.
+    '''
+    def __init__(self, threshold=0.1, samples=0):
+        self.enabled = False
+        self.threshold = threshold
+        self.samples = samples
+        self.slowest = []
+        self.counter = itertools.count()
+        self.lock = Lock()
+        self.profiling = False
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, label, size, func, *args):
+        if not self.enabled:
+            return func(*args)
+        profile = self.acquire()
+        start = time.perf_counter()
+        try:
+            if profile is None:
+                return func(*args)
+            return profile.runcall(func, *args)
+        finally:
+            duration = time.perf_counter() - start
+            if profile is not None:
+                self.release(label, duration, profile)
+            if duration >= self.threshold:
+                self.logger.warning("Slow %s took %.3fs (%d bytes)", label,
+                                    duration, size)
+
+    def acquire(self):
+        if not self.samples:
+            return None
+        with self.lock:
+            if self.profiling:
+                return None
+            self.profiling = True
+        return cProfile.Profile()
+
+    def release(self, label, duration, profile):
+        with self.lock:
+            self.profiling = False
+            sample = (duration, next(self.counter), label, profile)
+            if len(self.slowest) < self.samples:
+                heapq.heappush(self.slowest, sample)
+            elif duration > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, sample)
+
+    def report(self):
+        with self.lock:
+            samples = sorted(self.slowest, reverse=True)
+        return ["{} {:.3f}s".format(label, duration)
+                for duration, _, label, _ in samples]
+
+    def dump(self, filename):
+        with self.lock:
+            samples = sorted(self.slowest, reverse=True)
+        if not samples:
+            return False
+        stats = pstats.Stats(samples[0][3])
+        for sample in samples[1:]:
+            stats.add(sample[3])
+        stats.dump_stats(filename)
+        return True
+
+    def reset(self):
+        with self.lock:
+            self.slowest = []
+
+def size(args):
+    return sum(len(arg) for arg in args if isinstance(arg, str))
+
+PROFILER = Profiler()
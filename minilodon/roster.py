@@ -0,0 +1,64 @@
+class Roster(object):
+    '''The users of the main channel, maintained from channel events.
+
+    Nicks are stored by their lowercased form. `count` excludes the bot
+    itself and ChanServ, so checking whether one user is left is O(1).
+    '''
+    def __init__(self, nick):
+        self.users = {}
+        self.count = 0
+        self.ignored = {'chanserv', nick.lower()}
+        self.nick = nick.lower()
+
+    def __contains__(self, nick):
+        return nick.lower() in self.users
+
+    def __iter__(self):
+        return iter(list(self.users.values()))
+
+    def __len__(self):
+        return len(self.users)
+
+    def setnick(self, nick):
+        if self.nick in self.users:
+            self.count += 1
+        self.nick = nick.lower()
+        self.ignored = {'chanserv', self.nick}
+        if self.nick in self.users:
+            self.count -= 1
+
+    def is_ignored(self, nick):
+        return nick.lower() in self.ignored
+
+    def add(self, nick):
+        key = nick.lower()
+        if key not in self.users and key not in self.ignored:
+            self.count += 1
+        self.users[key] = nick
+
+    def remove(self, nick):
+        key = nick.lower()
+        if key in self.users:
+            del self.users[key]
+            if key not in self.ignored:
+                self.count -= 1
+
+    def rename(self, old, new):
+        if old.lower() == self.nick:
+            self.remove(old)
+            self.setnick(new)
+            self.add(new)
+        elif old in self:
+            self.remove(old)
+            self.add(new)
+
+    def clear(self):
+        self.users = {}
+        self.count = 0
+
+    def alone(self):
+        if self.count != 1:
+            return ''
+        for key, nick in self.users.items():
+            if key not in self.ignored:
+                return nick
@@ -0,0 +1,89 @@
+from datetime import date
+from threading import Thread
+import gzip
+import logging
+import os
+import queue
+import shutil
+
+class Rotator(Thread):
+    '''Compresses and expires old channel logs from a background thread.
+
+    Daily logs older than `keepraw` days are gzipped in place, and with
+    `keepcompressed` set, compressed logs are deleted once they are more
+    than `keepraw + keepcompressed` days old. The log writer hands over a
+    channel whenever it rotates that channel's log, so compressing never
+    holds up writing.
+    '''
+    def __init__(self, directory='', keepraw=7, keepcompressed=None):
+        Thread.__init__(self)
+        self.daemon = True
+        self.directory = directory
+        self.keepraw = max(keepraw, 1)
+        self.keepcompressed = keepcompressed
+        self.queue = queue.Queue()
+        self.logger = logging.getLogger(__name__)
+
+    def rotate(self, channel):
+        self.queue.put(channel)
+
+    def rotate_all(self):
+        directory = self.directory or '.'
+        if not os.path.isdir(directory):
+            return
+        for channel in os.listdir(directory):
+            if os.path.isdir(os.path.join(directory, channel)):
+                self.rotate(channel)
+
+    def stop(self):
+        self.queue.put(None)
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while True:
+            channel = self.queue.get()
+            if channel is None:
+                return
+            try:
+                self.sweep(channel)
+            except OSError:
+                self.logger.exception("Rotating logs of %s failed", channel)
+
+    def sweep(self, channel, today=None):
+        if today is None:
+            today = date.today()
+        path = os.path.join(self.directory, channel)
+        suffix = '-{}.log'.format(channel)
+        for name in os.listdir(path):
+            filename = os.path.join(path, name)
+            if name.endswith('.gz.tmp'):
+                os.remove(filename)
+                continue
+            compressed = name.endswith(suffix + '.gz')
+            if not compressed and not name.endswith(suffix):
+                continue
+            try:
+                day = date(2000 + int(name[0:2]), int(name[3:5]),
+                           int(name[6:8]))
+            except ValueError:
+                continue
+            age = (today - day).days
+            if not compressed and age > self.keepraw:
+                self.compress(filename)
+            elif (compressed and self.keepcompressed is not None and
+                  age > self.keepraw + self.keepcompressed):
+                self.expire(filename[:-3])
+
+    def compress(self, filename):
+        tmpname = filename + '.gz.tmp'
+        with open(filename, 'rb') as logfile:
+            with gzip.open(tmpname, 'wb') as gzfile:
+                shutil.copyfileobj(logfile, gzfile)
+        os.replace(tmpname, filename + '.gz')
+        os.remove(filename)
+
+    def expire(self, filename):
+        os.remove(filename + '.gz')
+        if os.path.exists(filename + '.idx'):
+            os.remove(filename + '.idx')
@@ -0,0 +1,115 @@
+import time
+
+from minilodon.profiler import PROFILER
+
+class _Node(object):
+    __slots__ = ('children', 'target')
+
+    def __init__(self):
+        self.children = {}
+        self.target = None
+
+class CommandRouter(object):
+    '''Maps command names, aliases and unambiguous prefixes to handlers.
+
+    Names and aliases are kept in a trie so a prefix can be resolved without
+    scanning every command, and resolved tokens are cached until the set of
+    commands changes. Only the command name is split off before resolving;
+    the full argument list is built once a handler is found. `stats` holds
+    the number of calls, total and slowest dispatch time per command.
+    '''
+    def __init__(self, cachesize=1024):
+        self.cachesize = cachesize
+        self.handlers = {}
+        self.aliases = {}
+        self.root = _Node()
+        self.cache = {}
+        self.stats = {}
+
+    def __contains__(self, name):
+        return name in self.handlers or name in self.aliases
+
+    def __getitem__(self, name):
+        return self.handlers[self.aliases.get(name, name)]
+
+    def __setitem__(self, name, handler):
+        self.add(name, handler)
+
+    def __iter__(self):
+        return iter(list(self.handlers))
+
+    def __len__(self):
+        return len(self.handlers)
+
+    def add(self, name, handler, aliases=()):
+        if name not in self:
+            self.insert(name, name)
+        self.handlers[name] = handler
+        for alias in aliases:
+            self.alias(alias, name)
+        self.cache = {}
+
+    def alias(self, alias, name):
+        if alias in self:
+            return
+        self.aliases[alias] = name
+        self.insert(alias, name)
+        self.cache = {}
+
+    def insert(self, word, target):
+        node = self.root
+        for char in word:
+            node = node.children.setdefault(char, _Node())
+        node.target = target
+
+    def resolve(self, token):
+        if token in self.cache:
+            return self.cache[token]
+        target = self.aliases.get(token, token)
+        if target not in self.handlers:
+            target = self.complete(token)
+        if len(self.cache) >= self.cachesize:
+            self.cache = {}
+        self.cache[token] = target
+        return target
+
+    def complete(self, prefix):
+        if not prefix:
+            return None
+        node = self.root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        targets = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.target is not None:
+                targets.add(node.target)
+                if len(targets) > 1:
+                    return None
+            stack.extend(node.children.values())
+        return targets.pop() if targets else None
+
+    def dispatch(self, nick, cmd):
+        name = cmd.split(' ', 1)[0]
+        target = self.resolve(name)
+        if target is None:
+            return None
+        start = time.time()
+        try:
+            return PROFILER.run('!' + target, len(cmd),
+                                self.handlers[target], nick, cmd.split(' '))
+        finally:
+            self.record(target, time.time() - start)
+
+    def record(self, name, duration):
+        stats = self.stats.get(name)
+        if stats is None:
+            self.stats[name] = [1, duration, duration]
+            return
+        stats[0] += 1
+        stats[1] += duration
+        if duration > stats[2]:
+            stats[2] = duration
@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from minilodon.actions import ActionStore, JournalActionStore, Template
+
+class TemplateTest(unittest.TestCase):
+    def test_render(self):
+        template = Template('/me slaps {victim} for {nick}.')
+        self.assertEqual(template.render('victim', 'nick'),
+                         '/me slaps victim for nick.')
+
+    def test_literal(self):
+        template = Template('{{no fields}}')
+        self.assertEqual(template.render('victim', 'nick'), '{no fields}')
+
+    def test_spec(self):
+        template = Template('{victim!r:>10}|{nick:.2}')
+        self.assertEqual(template.render('victim', 'nick'), '  \'victim\'|ni')
+
+    def test_unknown_field(self):
+        with self.assertRaises(KeyError):
+            Template('{who}')
+        with self.assertRaises(KeyError):
+            Template('{0}')
+
+    def test_malformed(self):
+        with self.assertRaises(ValueError):
+            Template('{victim')
+        with self.assertRaises(ValueError):
+            Template('{victim:d}')
+
+class ActionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'actions.json')
+        with open(self.filename, 'w') as actions_file:
+            json.dump({'category': {'key': 'value'}}, actions_file)
+        self.store = ActionStore(self.filename, delay=60.0)
+        self.store.load()
+
+    def tearDown(self):
+        if self.store.timer is not None:
+            self.store.timer.cancel()
+        shutil.rmtree(self.dir)
+
+    def read(self):
+        with open(self.filename) as actions_file:
+            return json.load(actions_file)
+
+    def test_load(self):
+        self.assertIn('category', self.store)
+        self.assertEqual(self.store.get('category', 'key'), 'value')
+        self.assertEqual(self.store.template('category', 'key').source, 'value')
+        self.assertIsNone(self.store.get('category', 'other'))
+        self.assertIsNone(self.store.get('other', 'key'))
+        self.assertEqual(list(self.store), ['category'])
+
+    def test_set(self):
+        self.assertFalse(self.store.set('category', 'key2', 'value2'))
+        self.assertTrue(self.store.set('new', 'key', 'value'))
+        self.assertEqual(self.store.keys('category'), ['key', 'key2'])
+        with self.assertRaises(KeyError):
+            self.store.set('category', 'bad', '{who}')
+        self.assertIsNone(self.store.get('category', 'bad'))
+
+    def test_debounce(self):
+        self.store.save = Mock()
+        self.store.set('category', 'a', 'a')
+        first = self.store.timer
+        self.store.set('category', 'b', 'b')
+        self.assertTrue(first.finished.is_set())
+        self.store.flush()
+        self.store.save.assert_called_once_with()
+        self.assertIsNone(self.store.timer)
+
+    def test_save(self):
+        self.store.set('category', 'key2', 'value2')
+        self.store.delete('category', 'key')
+        self.store.flush()
+        self.assertEqual(self.read(), {'category': {'key2': 'value2'}})
+        self.assertFalse(os.path.exists(self.filename + '.tmp'))
+
+    def test_flush_clean(self):
+        self.store.save = Mock()
+        self.store.flush()
+        self.assertFalse(self.store.save.called)
+
+class JournalActionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'actions.json')
+        with open(self.filename, 'w') as actions_file:
+            json.dump({'category': {'key': 'value'}}, actions_file)
+        self.store = JournalActionStore(self.filename, minsize=0)
+        self.store.load()
+
+    def tearDown(self):
+        self.store.flush()
+        self.store.journal.close()
+        shutil.rmtree(self.dir)
+
+    def reopen(self):
+        self.store.flush()
+        self.store.journal.close()
+        self.store = JournalActionStore(self.filename, minsize=0)
+        self.store.load()
+
+    def test_replay(self):
+        self.store.minsize = 1e9
+        self.store.set('category', 'key2', 'value2')
+        self.store.delete('category', 'key')
+        self.reopen()
+        self.assertEqual(self.store.actions, {'category': {'key2': 'value2'}})
+
+    def test_torn_record(self):
+        self.store.minsize = 1e9
+        self.store.set('category', 'key2', 'value2')
+        self.store.journal.write('["set", "category", "key3"')
+        self.reopen()
+        self.store.set('category', 'key4', 'value4')
+        self.reopen()
+        self.assertEqual(self.store.keys('category'), ['key', 'key2', 'key4'])
+
+    def test_compact(self):
+        self.store.set('category', 'key2', 'value2')
+        self.store.flush()
+        self.assertIsNone(self.store.compactor)
+        with open(self.filename) as actions_file:
+            snapshot = json.load(actions_file)
+        self.assertEqual(snapshot, {'category': {'key': 'value',
+                                                 'key2': 'value2'}})
+        self.assertEqual(os.path.getsize(self.store.journalname), 0)
+        self.assertFalse(os.path.exists(self.store.compactname))
+
+    def test_crash_during_compact(self):
+        self.store.minsize = 1e9
+        self.store.set('category', 'key2', 'value2')
+        self.store.journal.close()
+        os.replace(self.store.journalname, self.store.compactname)
+        self.store.journal = open(self.store.journalname, 'a')
+        self.store.delete('category', 'key')
+        self.reopen()
+        self.assertEqual(self.store.actions, {'category': {'key2': 'value2'}})
+        self.assertFalse(os.path.exists(self.store.compactname))
@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from unittest.mock import Mock, patch
+
+from minilodon.aio import AsyncMinilodon, LoopScheduler
+from minilodon.minilodon import Minilodon
+from minilodon.tests.minilodon_test import CONFIG
+
+class LoopSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.scheduler = LoopScheduler(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_execute_after(self):
+        func = Mock(side_effect=lambda: self.loop.stop())
+        self.scheduler.execute_after(0, func)
+        self.loop.run_forever()
+        func.assert_called_once_with()
+
+    def test_execute_every(self):
+        calls = []
+        def func():
+            calls.append(1)
+            if len(calls) == 3:
+                self.loop.stop()
+        self.scheduler.execute_every(0, func)
+        self.loop.run_forever()
+        self.assertEqual(len(calls), 3)
+
+class AsyncMinilodonTest(unittest.TestCase):
+    @patch('json.load')
+    @patch('builtins.open')
+    def setUp(self, _open, _load):
+        _load.return_value = dict(CONFIG, asyncio=True)
+        self.bot = Minilodon.create('config.json')
+        self.loop = self.bot.reactor.loop
+        self.connection = Mock()
+        self.connection.get_nickname.return_value = 'nick'
+        self.bot.connection = self.connection
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_create(self):
+        self.assertIsInstance(self.bot, AsyncMinilodon)
+        self.assertIsInstance(self.bot.reactor.scheduler, LoopScheduler)
+
+    def test_call_soon(self):
+        func = Mock(side_effect=lambda arg: self.loop.stop())
+        self.bot.call_soon(func, 'arg')
+        self.loop.run_forever()
+        func.assert_called_once_with('arg')
+
+    def test_connect_refused(self):
+        async def connect(*args, **kwargs):
+            raise ConnectionRefusedError()
+        self.connection.connect = connect
+        self.bot.logger = Mock()
+        self.bot._connect()
+        self.assertTrue(self.bot.logger.error.called)
+        event = self.connection._handle_event.call_args[0][0]
+        self.assertEqual(event.type, 'disconnect')
+
+    def test_async_command(self):
+        self.bot.log = Mock()
+        async def command(nick, args):
+            await asyncio.sleep(0)
+            return 'result'
+        self.bot.commands['command'] = command
+        event = Mock()
+        event.source.nick = 'nick'
+        self.bot.send_msg(self.bot.do_command(event, 'command'))
+        self.loop.call_later(0.01, self.loop.stop)
+        self.loop.run_forever()
+        self.connection.privmsg.assert_called_once_with('#channel', 'result')
+
+    def test_async_error(self):
+        async def command():
+            raise ValueError()
+        self.bot.logger = Mock()
+        callback = Mock()
+        self.bot.run_async(command(), callback)
+        self.loop.call_later(0.01, self.loop.stop)
+        self.loop.run_forever()
+        self.assertFalse(callback.called)
+        self.assertTrue(self.bot.logger.error.called)
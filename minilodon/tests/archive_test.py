@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+
+from minilodon.archive import Archive, DayIndex, recent
+from minilodon.logwriter import LogWriter
+from minilodon.rotation import Rotator
+
+def _timestamp(*args):
+    return datetime(*args).timestamp()
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.archive = Archive(self.dir, tokens=True)
+        self.writer = LogWriter(flush_interval=60.0, directory=self.dir,
+                                archive=self.archive)
+
+    def tearDown(self):
+        if self.archive.builder is not None:
+            self.archive.builder.join()
+        shutil.rmtree(self.dir)
+
+    def path(self, date):
+        return os.path.join(self.dir, '#test',
+                            '{}-#test.log'.format(date))
+
+    def write(self, msg, *timestamp):
+        self.writer.handle(('write', '#test', _timestamp(*timestamp), msg))
+
+    def fill(self):
+        self.write('<alice> hello world', 2001, 1, 1, 12)
+        self.write('bob [u@h] joined #test', 2001, 1, 1, 12, 1)
+        self.write('<bob> hi alice, wörld', 2001, 1, 1, 12, 2)
+        self.write('<alice> bye', 2001, 1, 2, 9)
+        self.writer.shutdown()
+
+    def test_sidecar(self):
+        self.fill()
+        with open(self.path('01-01-01') + '.idx') as index_file:
+            data = json.load(index_file)
+        self.assertEqual(data['nicks'], {'alice': [0], 'bob': [79]})
+        self.assertEqual(data['words']['hello'], [0])
+        self.assertEqual(data['size'], os.path.getsize(self.path('01-01-01')))
+
+    def test_seen(self):
+        self.fill()
+        self.assertEqual(self.archive.seen('Alice'),
+                         ('#test', '02-01-01 09:00:00 <alice> bye'))
+        self.assertEqual(self.archive.seen('bob'),
+                         ('#test', '01-01-01 12:02:00 <bob> hi alice, wörld'))
+        self.assertIsNone(self.archive.seen('carol'))
+
+    def test_seen_map(self):
+        self.fill()
+        with open(os.path.join(self.dir, 'seen.json')) as seen_file:
+            data = json.load(seen_file)
+        self.assertEqual(data['date'], '01-01-02')
+        self.assertEqual(data['nicks']['bob'], {'#test': ['01-01-01', 79]})
+        archive = Archive(self.dir)
+        self.assertEqual(archive.seen('bob'),
+                         ('#test', '01-01-01 12:02:00 <bob> hi alice, wörld'))
+        self.assertEqual(list(archive.days), [os.path.abspath(
+            self.path('01-01-02'))])
+
+    def test_build(self):
+        self.fill()
+        os.remove(os.path.join(self.dir, 'seen.json'))
+        archive = Archive(self.dir)
+        archive.seen('bob')
+        archive.builder.join()
+        self.assertEqual(archive.seen('bob'),
+                         ('#test', '01-01-01 12:02:00 <bob> hi alice, wörld'))
+        self.assertTrue(os.path.exists(os.path.join(self.dir, 'seen.json')))
+
+    def test_recent(self):
+        logs = [('01-01-03', '#a', 'a3'), ('01-01-03', '#b', 'b3'),
+                ('01-01-02', '#a', 'a2'), ('01-01-01', '#a', 'a1')]
+        self.assertEqual(recent(logs, 2), logs[:3])
+
+    def test_lastlog(self):
+        self.fill()
+        result = self.archive.lastlog('alice')
+        self.assertEqual(result, [('#test', '02-01-01 09:00:00 <alice> bye'),
+                                  ('#test', '01-01-01 12:00:00 <alice> '
+                                            'hello world')])
+
+    def test_grep_tokens(self):
+        self.fill()
+        result = self.archive.grep('hello')
+        self.assertEqual(result, [('#test', '01-01-01 12:00:00 <alice> '
+                                            'hello world')])
+
+    def test_grep_regex(self):
+        self.fill()
+        result = self.archive.grep('w.rld')
+        self.assertEqual([line for _, line in result],
+                         ['01-01-01 12:02:00 <bob> hi alice, wörld',
+                          '01-01-01 12:00:00 <alice> hello world'])
+
+    def test_lastlog_days(self):
+        self.fill()
+        self.write('<bob> later', 2001, 1, 5, 9)
+        self.writer.shutdown()
+        self.assertEqual(len(self.archive.lastlog('bob', days=1)), 1)
+        self.assertEqual(len(self.archive.lastlog('bob', days=5)), 2)
+
+    def test_grep_substring(self):
+        self.fill()
+        plain = Archive(self.dir)
+        for archive in (self.archive, plain):
+            self.assertEqual([line for _, line in archive.grep('rld')],
+                             ['01-01-01 12:02:00 <bob> hi alice, wörld',
+                              '01-01-01 12:00:00 <alice> hello world'])
+            self.assertEqual([line for _, line in archive.grep('alice')],
+                             ['01-01-01 12:02:00 <bob> hi alice, wörld'])
+
+    def test_grep_days(self):
+        self.fill()
+        self.assertEqual(self.archive.grep('hello', 1), [])
+
+    def test_grep_count(self):
+        self.fill()
+        archive = Archive(self.dir)
+        self.assertEqual(archive.grep('w.rld', count=1),
+                         [('#test', '01-01-01 12:02:00 <bob> hi alice, wörld')])
+
+    def test_catch_up(self):
+        self.fill()
+        with open(self.path('01-01-02'), 'a') as logfile:
+            logfile.write('02-01-01 10:00:00 <carol> late\n')
+            logfile.write('02-01-01 10:00:01 <carol> partial')
+        archive = Archive(self.dir)
+        self.assertEqual(archive.seen('carol'),
+                         ('#test', '02-01-01 10:00:00 <carol> late'))
+
+    def test_rebuild(self):
+        self.fill()
+        os.remove(self.path('01-01-01') + '.idx')
+        index = DayIndex.load(self.path('01-01-01'))
+        self.assertEqual(index.nicks, {'alice': [0], 'bob': [79]})
+        self.assertEqual(index.words, {})
+
+    def test_evict(self):
+        self.archive.cachesize = 1
+        self.write('<alice> hello', 2001, 1, 1, 12)
+        self.write('<alice> bye', 2001, 1, 2, 12)
+        self.assertTrue(os.path.exists(self.path('01-01-01') + '.idx'))
+        self.assertEqual(len(self.archive.days), 1)
+        self.writer.shutdown()
+
+    def test_compressed(self):
+        self.fill()
+        Rotator(self.dir, keepraw=1).sweep('#test', date(2001, 1, 5))
+        self.assertFalse(os.path.exists(self.path('01-01-01')))
+        archive = Archive(self.dir, tokens=True)
+        self.assertEqual(archive.lastlog('alice')[1],
+                         ('#test', '01-01-01 12:00:00 <alice> hello world'))
+        self.assertEqual(len(archive.grep('w.rld')), 2)
+        os.remove(self.path('01-01-01') + '.idx')
+        archive = Archive(self.dir, tokens=True)
+        self.assertEqual(archive.grep('hello'),
+                         [('#test', '01-01-01 12:00:00 <alice> hello world')])
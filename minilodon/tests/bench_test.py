@@ -0,0 +1,63 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from minilodon import bench
+
+class BenchTest(unittest.TestCase):
+    def test_timestamps(self):
+        strftime, cached = bench.bench_timestamps(1000)
+        self.assertGreater(strftime, 0)
+        self.assertGreater(cached, 0)
+
+    def test_main(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            bench.main(['timestamps', '-n', '100'])
+        self.assertIn('speedup', out.getvalue())
+
+    def test_parse_line(self):
+        e = bench.parse_line(':alice!u@h PRIVMSG #chan :hello there\r\n')
+        self.assertEqual((e.type, e.source.nick, e.target, e.arguments),
+                         ('pubmsg', 'alice', '#chan', ['hello there']))
+        e = bench.parse_line(':alice!u@h PRIVMSG minilodon :!roll d6')
+        self.assertEqual(e.type, 'privmsg')
+        e = bench.parse_line(':alice!u@h QUIT :Ping timeout')
+        self.assertEqual((e.type, e.target, e.arguments),
+                         ('quit', None, ['Ping timeout']))
+        e = bench.parse_line(':server 353 minilodon = #chan :alice @bob')
+        self.assertEqual((e.type, e.target, e.arguments),
+                         ('namreply', 'minilodon', ['=', '#chan', 'alice @bob']))
+        e = bench.parse_line(':alice!u@h KICK #chan bob :bye')
+        self.assertEqual(e.arguments, ['bob', 'bye'])
+        self.assertIsNone(bench.parse_line(':server 001 minilodon :Welcome'))
+        self.assertIsNone(bench.parse_line('PING :server'))
+
+    def test_events(self):
+        for name, scenario in bench.SCENARIOS.items():
+            prelude, events = scenario(50)
+            result = bench.bench_events(prelude, events)
+            self.assertEqual(result['events'], len(events))
+            self.assertGreater(result['rate'], 0)
+            self.assertLessEqual(result['p50'], result['p99'])
+            self.assertGreater(result['rss'], 0)
+
+    def test_replay(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'replay.txt')
+            with open(filename, 'w') as replay_file:
+                replay_file.write(':alice!u@h JOIN #chan\n'
+                                  ':alice!u@h PRIVMSG #chan :hi\n'
+                                  'PING :server\n')
+            out = io.StringIO()
+            with redirect_stdout(out):
+                bench.main(['events', '--replay', filename,
+                            '--channel', '#chan'])
+            lines = out.getvalue().splitlines()
+            self.assertEqual(lines[1].split()[:2], ['replay', '2'])
+        finally:
+            shutil.rmtree(directory)
@@ -1,9 +1,14 @@
+import asyncio
 import itertools
+import threading
 import unittest
 import time
 from unittest.mock import Mock, MagicMock, patch
 
 from freezegun import freeze_time
+from youtube_dl.utils import DownloadError
+
+from minilodon.actions import ActionStore, Template
 
 def _command(name, control=False):
     return lambda f: f
@@ -11,16 +16,15 @@ def _command(name, control=False):
 def _message():
     return lambda f: f
 
-mockMinilodon = Mock(command=_command, message=_message)
+mockMinilodon = Mock(command=_command, message=_message, config={})
+mockMinilodon.budget.return_value = 411
 mockYDL = Mock()
 
-patcher = patch('minilodon.minilodon.Minilodon', Mock(return_value=mockMinilodon))
-patcher2 = patch('youtube_dl.YoutubeDL', Mock(return_value=mockYDL))
+patcher = patch('minilodon.minilodon.Minilodon',
+                Mock(create=Mock(return_value=mockMinilodon)))
 patcher.start()
-patcher2.start()
 import minilodon.bot as bot
 patcher.stop()
-patcher2.stop()
 
 class UpdateTest(unittest.TestCase):
     def test_no_args(self):
@@ -39,34 +43,48 @@ class UpdateTest(unittest.TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0], "Failed to parse message on 'who'")
 
-    @patch('minilodon.bot.load_actions')
-    @patch('minilodon.bot.parse_actions')
-    @patch('json.dump')
-    @patch('builtins.open')
-    def test_update(self, _open, _dump, _parse_actions, _load_actions):
-        _parse_actions.return_value = {}
+    def test_invalid_format(self):
+        result = list(bot.update('nick', ['update', 'category',
+                                          'key', '{victim']))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0][:24], "Failed to parse message:")
+
+    @patch('minilodon.bot.add_category')
+    @patch('minilodon.bot.actions')
+    def test_update(self, _actions, _add_category):
+        _actions.set.return_value = True
         result = list(bot.update('nick', ['update', 'category', 'key',
                                           'hello', 'world']))
-        self.assertTrue(_dump.called)
-        actions = _dump.call_args[0][0]
-        self.assertEqual(actions, {'category': {'key': 'hello world'}})
-        _load_actions.assert_called_once_with()
+        _actions.set.assert_called_once_with('category', 'key', 'hello world')
+        _add_category.assert_called_once_with('category')
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0], 'key added to category.')
 
-    @patch('minilodon.bot.load_actions')
-    @patch('minilodon.bot.parse_actions')
-    @patch('json.dump')
-    @patch('builtins.open')
-    def test_long_update(self, _open, _dump, _parse_actions, _load_actions):
-        _parse_actions.return_value = {}
-        teststr = list(itertools.repeat('hello', 50))
+    @patch('minilodon.bot.add_category')
+    @patch('minilodon.bot.actions')
+    def test_update_existing(self, _actions, _add_category):
+        _actions.set.return_value = False
+        list(bot.update('nick', ['update', 'category', 'key', 'hello']))
+        self.assertFalse(_add_category.called)
+
+    @patch('minilodon.bot.add_category')
+    @patch('minilodon.bot.actions')
+    def test_long_update(self, _actions, _add_category):
+        teststr = list(itertools.repeat('\u00e9' * 5, 60))
         result = list(bot.update('nick', ['update', 'category',
                                           'key'] + teststr))
         self.assertEqual(len(result), 2)
         self.assertEqual(result[0], 'Warning: Entry too long, message will be wrapped.')
         self.assertEqual(result[1], 'key added to category.')
 
+    @patch('minilodon.bot.add_category')
+    @patch('minilodon.bot.actions')
+    def test_update_within_budget(self, _actions, _add_category):
+        teststr = list(itertools.repeat('hello', 60))
+        result = list(bot.update('nick', ['update', 'category',
+                                          'key'] + teststr))
+        self.assertEqual(result, ['key added to category.'])
+
     def test_updateme_noargs(self):
         result = bot.updateme('nick', ['updateme'])
         self.assertEqual(result[:6], 'Usage:')
@@ -82,29 +100,26 @@ class DeleteTest(unittest.TestCase):
         result = bot.delete('nick', [])
         self.assertEqual(result[:6], 'Usage:')
 
-    @patch('minilodon.bot.parse_actions')
-    def test_no_category(self, _parse_actions):
-        _parse_actions.return_value = {}
-        result = bot.delete('nick', ['delete', 'category', 'key'])
-        self.assertEqual(result, 'Category category not found!')
-
-    @patch('minilodon.bot.parse_actions')
-    def test_no_key(self, _parse_actions):
-        _parse_actions.return_value = {'category': {}}
-        result = bot.delete('nick', ['delete', 'category', 'key'])
-        self.assertEqual(result, 'Key key not found in category')
-
-    @patch('minilodon.bot.load_actions')
-    @patch('minilodon.bot.parse_actions')
-    @patch('json.dump')
-    @patch('builtins.open')
-    def test_delete(self, _open, _dump, _parse_actions, _load_actions):
-        _parse_actions.return_value = {'category': {'key': 'value'}}
-        result = bot.delete('nick', ['delete', 'category', 'key'])
-        self.assertTrue(_dump.called)
-        actions = _dump.call_args[0][0]
-        self.assertEqual(actions, {'category': {}})
-        _load_actions.assert_called_once_with()
+    def setUp(self):
+        self.actions = ActionStore('actions.json')
+        self.actions.schedule_save = Mock()
+        self.actions.actions = {'category': {'key': 'value'}}
+
+    def test_no_category(self):
+        with patch('minilodon.bot.actions', self.actions):
+            result = bot.delete('nick', ['delete', 'other', 'key'])
+        self.assertEqual(result, 'Category other not found!')
+
+    def test_no_key(self):
+        with patch('minilodon.bot.actions', self.actions):
+            result = bot.delete('nick', ['delete', 'category', 'other'])
+        self.assertEqual(result, 'Key other not found in category')
+
+    def test_delete(self):
+        with patch('minilodon.bot.actions', self.actions):
+            result = bot.delete('nick', ['delete', 'category', 'key'])
+        self.assertEqual(self.actions.actions, {'category': {}})
+        self.actions.schedule_save.assert_called_once_with()
         self.assertEqual(result, 'key removed from category.')
 
 class SayTest(unittest.TestCase):
@@ -184,23 +199,31 @@ class SpyTest(unittest.TestCase):
         bot.spy_timer.cancel.assert_called_once_with()
         _stop_spy.assert_called_once_with()
 
+class CacheTest(unittest.TestCase):
+    @patch('minilodon.bot.cache')
+    def test_cache_stats(self, _cache):
+        _cache.__len__.return_value = 3
+        _cache.hits = 2
+        _cache.misses = 1
+        result = bot.cache_stats('nick', ['cache'])
+        self.assertEqual(result, 'Preview cache: 3 entries, 2 hits, 1 misses.')
+
 class ListTest(unittest.TestCase):
     def test_no_args(self):
         result = bot.list_all('nick', ['list'])
         self.assertEqual(result[:6], 'Usage:')
 
-    @patch('minilodon.bot.parse_actions')
-    def test_no_category(self, _parse_actions):
-        _parse_actions.return_value = {}
+    @patch('minilodon.bot.actions', ActionStore('actions.json'))
+    def test_no_category(self):
         result = bot.list_all('nick', ['list', 'category'])
         self.assertEqual(result, 'category niet gevonden.')
 
-    @patch('minilodon.bot.parse_actions')
-    def test_list(self, _parse_actions):
-        _parse_actions.return_value = {'category': {'key': 'value'}}
+    @patch('minilodon.bot.actions', ActionStore('actions.json'))
+    def test_list(self):
+        bot.actions.actions = {'category': {'key': 'value', 'a': 'b'}}
         result = bot.list_all('nick', ['list', 'category'])
         bot.bot.send_priv_msg.assert_called_with('nick',
-                                                 'Alle category: key')
+                                                 'Alle category: a, key')
         self.assertEqual(result, 'Zie prive voor een lijst van alle opties.')
 
 class RollTest(unittest.TestCase):
@@ -247,27 +270,106 @@ class RollTest(unittest.TestCase):
         _randint.assert_called_with(1, 20)
 
 class MessageTest(unittest.TestCase):
-    @patch('minilodon.bot.video')
-    def test_video(self, _video):
+    def setUp(self):
+        bot.scanner.recent.clear()
+
+    @patch('minilodon.bot.cache')
+    @patch('minilodon.bot.previewer')
+    def test_video(self, _previewer, _cache):
+        bot.spy_function = None
+        _cache.get.return_value = (False, None)
+        result = bot.on_message('nick', 'http://example.com')
+        urls, callback = _previewer.submit_all.call_args[0]
+        self.assertEqual(urls, ['http://example.com'])
+        self.assertEqual(callback.func, bot.post_preview)
+        self.assertEqual(callback.args, (bot.bot.current,))
+        self.assertIsNone(result)
+
+    @patch('minilodon.bot.cache')
+    @patch('minilodon.bot.previewer')
+    def test_video_in_text(self, _previewer, _cache):
+        bot.spy_function = None
+        _cache.get.return_value = (False, None)
+        bot.on_message('nick', 'see http://a.example and https://b.example.')
+        urls = _previewer.submit_all.call_args[0][0]
+        self.assertEqual(urls, ['http://a.example', 'https://b.example'])
+
+    @patch('minilodon.bot.cache')
+    @patch('minilodon.bot.previewer')
+    def test_video_repeated(self, _previewer, _cache):
+        bot.spy_function = None
+        _cache.get.return_value = (False, None)
+        bot.on_message('nick', 'http://example.com')
+        bot.on_message('nick', 'again http://example.com')
+        self.assertEqual(_previewer.submit_all.call_count, 1)
+
+    @patch('minilodon.bot.cache')
+    @patch('minilodon.bot.previewer')
+    def test_video_cached(self, _previewer, _cache):
         bot.spy_function = None
-        list(bot.on_message('nick', 'http://example.com'))
-        _video.assert_called_once_with('http://example.com')
+        _cache.get.return_value = (True, '[extractor] title')
+        result = bot.on_message('nick', 'http://example.com')
+        self.assertFalse(_previewer.submit_all.called)
+        self.assertEqual(result, ['[extractor] title'])
 
+    @patch('minilodon.bot.cache')
     @patch('minilodon.bot.video')
-    def test_novideo(self, _video):
+    def test_fetch_preview(self, _video, _cache):
+        _video.return_value = None
+        result = bot.fetch_preview('http://example.com')
+        _cache.put.assert_called_once_with('http://example.com', None)
+        self.assertIsNone(result)
+
+    @patch('minilodon.bot.previewer')
+    def test_novideo(self, _previewer):
         bot.spy_function = None
-        list(bot.on_message('nick', 'gopher://example.com'))
-        self.assertFalse(_video.called)
+        bot.on_message('nick', 'gopher://example.com')
+        self.assertFalse(_previewer.submit_all.called)
+
+    def test_post_preview(self):
+        instance = Mock()
+        bot.post_preview(instance, '[extractor] title')
+        instance.call_soon.assert_called_with(instance.send_msg,
+                                              '[extractor] title')
 
     def test_spy(self):
         bot.spy_function = Mock()
-        list(bot.on_message('nick', 'Hello World!'))
+        bot.on_message('nick', 'Hello World!')
         bot.spy_function.assert_called_once_with('nick', 'Hello World!')
         bot.spy_function = None
 
+class YDLTest(unittest.TestCase):
+    def setUp(self):
+        bot.ydl = None
+
+    def tearDown(self):
+        bot.ydl = None
+
+    @patch('youtube_dl.YoutubeDL')
+    def test_lazy(self, _ydl):
+        self.assertFalse(_ydl.called)
+        result = bot.get_ydl()
+        self.assertEqual(result, _ydl.return_value)
+        self.assertIs(bot.get_ydl(), result)
+        _ydl.assert_called_once()
+        self.assertFalse(result.add_default_info_extractors.called)
+
+    @patch.dict(mockMinilodon.config, {'extractors': ['Youtube', 'Vimeo']})
+    def test_allowlist(self):
+        result = bot.get_ydl()
+        self.assertEqual([ie.ie_key() for ie in result._ies],
+                         ['Youtube', 'Vimeo'])
+
+    @patch.dict(mockMinilodon.config, {'extractors': ['Youtube', 'Bogus']})
+    def test_allowlist_invalid(self):
+        with self.assertRaises(KeyError):
+            bot.get_ydl()
+        self.assertIsNone(bot.ydl)
+
+@patch('minilodon.bot.get_ydl', Mock(return_value=mockYDL))
 class VideoTest(unittest.TestCase):
     def test_error(self):
-        mockYDL.extract_info.side_effect = bot.DownloadError('')
+        mockYDL.extract_info.side_effect = DownloadError('')
         result = bot.video('url')
         self.assertEqual(result, None)
         mockYDL.extract_info.side_effect = None
@@ -316,19 +418,111 @@ class VideoTest(unittest.TestCase):
         result = bot.video('url')
         self.assertEqual(result, '[extractor] title [2:04] | 1,024 views')
 
+@patch('minilodon.bot.bot')
+class ArchiveCommandTest(unittest.TestCase):
+    def test_disabled(self, _bot):
+        _bot.archive = None
+        self.assertEqual(bot.seen('nick', ['seen', 'alice']),
+                         'Log index is not enabled.')
+        self.assertEqual(bot.lastlog('nick', ['lastlog', 'alice']),
+                         'Log index is not enabled.')
+        self.assertEqual(bot.grep('nick', ['grep', 'x']),
+                         'Log index is not enabled.')
+
+    def test_usage(self, _bot):
+        self.assertEqual(bot.seen('nick', ['seen'])[:6], 'Usage:')
+        self.assertEqual(bot.lastlog('nick', ['lastlog'])[:6], 'Usage:')
+        self.assertEqual(bot.grep('nick', ['grep', 'x', 'y'])[:6], 'Usage:')
+
+    def test_seen(self, _bot):
+        _bot.archive.seen.return_value = ('#chan', 'line')
+        self.assertEqual(asyncio.run(bot.seen('nick', ['seen', 'alice'])),
+                         '#chan line')
+        _bot.archive.seen.return_value = None
+        self.assertEqual(asyncio.run(bot.seen('nick', ['seen', 'alice'])),
+                         'alice not seen.')
+
+    def test_lastlog(self, _bot):
+        _bot.archive.lastlog.return_value = [('#chan', 'b'), ('#chan', 'a')]
+        result = asyncio.run(bot.lastlog('nick', ['lastlog', 'alice']))
+        self.assertEqual(result, ['#chan a', '#chan b'])
+
+    def test_grep(self, _bot):
+        _bot.archive.grep.return_value = [('#chan', 'line')]
+        result = asyncio.run(bot.grep('nick', ['grep', 'x', '3']))
+        self.assertEqual(result, ['#chan line'])
+        _bot.archive.grep.assert_called_once_with('x', 3)
+        self.assertEqual(bot.grep('nick', ['grep', '('])[:16],
+                         'Invalid pattern:')
+
+    def test_background(self, _bot):
+        threads = []
+        def func(arg):
+            threads.append(threading.current_thread())
+            return arg
+        self.assertEqual(asyncio.run(bot.in_background(func, 'arg')), 'arg')
+        self.assertIsNot(threads[0], threading.main_thread())
+
+@patch('minilodon.bot.PROFILER')
+class ProfileTest(unittest.TestCase):
+    def test_usage(self, _profiler):
+        self.assertEqual(bot.profile('nick', ['profile'])[:6], 'Usage:')
+        self.assertEqual(bot.profile('nick', ['profile', 'x'])[:6], 'Usage:')
+        self.assertEqual(bot.profile('nick', ['profile', 'on', 'x'])[:6],
+                         'Usage:')
+
+    def test_on_off(self, _profiler):
+        result = bot.profile('nick', ['profile', 'on', '0.05'])
+        self.assertTrue(_profiler.enabled)
+        self.assertEqual(_profiler.threshold, 0.05)
+        self.assertEqual(result,
+                         'Profiling on, logging events slower than 0.05s.')
+        bot.profile('nick', ['profile', 'off'])
+        self.assertFalse(_profiler.enabled)
+
+    def test_top(self, _profiler):
+        _profiler.report.return_value = []
+        self.assertEqual(bot.profile('nick', ['profile', 'top']),
+                         'No samples.')
+        _profiler.report.return_value = ['pubmsg 0.200s']
+        self.assertEqual(bot.profile('nick', ['profile', 'top']),
+                         ['pubmsg 0.200s'])
+
+    def test_dump(self, _profiler):
+        _profiler.dump.return_value = True
+        result = bot.profile('nick', ['profile', 'dump'])
+        _profiler.dump.assert_called_once_with('minilodon.prof')
+        self.assertEqual(result, 'Wrote profile to minilodon.prof.')
+
+class MetricsTest(unittest.TestCase):
+    @patch('minilodon.bot.bot')
+    def test_collect(self, _bot):
+        _bot.commands.stats = {'roll': [2, 0.5, 0.3]}
+        _bot.control_commands.stats = {}
+        samples = list(bot.collect())
+        self.assertIn(('minilodon_command_calls_total',
+                       {'command': 'roll', 'kind': 'public'}, 2), samples)
+        self.assertIn(('minilodon_previews_dropped_total', {},
+                       bot.previewer.dropped), samples)
+
+    @patch('minilodon.bot.metrics')
+    @patch('minilodon.bot.bot')
+    def test_start_metrics(self, _bot, _metrics):
+        _bot.config = {'metricsport': 9100, 'metricsfile': 'metrics.prom'}
+        bot.start_metrics()
+        _metrics.REGISTRY.register.assert_called_once_with(bot.collect)
+        _metrics.serve.assert_called_once_with(9100, '127.0.0.1')
+        _bot.reactor.scheduler.execute_every.assert_called_once()
+
 class ActionsTest(unittest.TestCase):
-    @patch('builtins.open')
-    @patch('json.load')
-    def test_parse(self, _load, _open):
-        bot.parse_actions('file.json')
-        _open.assert_called_once_with('file.json')
-        _load.assert_called_once()
-
-    @patch('minilodon.bot.parse_actions')
-    def test_load(self, _parse_actions):
-        _parse_actions.return_value = {'category': {'key': '{victim} {nick}'}}
+    @patch('minilodon.bot.actions', ActionStore('actions.json'))
+    def test_load(self):
+        bot.actions.load = Mock()
+        bot.actions.actions = {'category': {'key': '{victim} {nick}'}}
+        bot.actions.templates = {'category': {'key': Template('{victim} {nick}')}}
         bot.bot.commands = {}
         bot.load_actions()
+        bot.actions.load.assert_called_once_with()
         self.assertIn('category', bot.bot.commands)
         lookup = bot.bot.commands['category']
         result = lookup('nick', ['category'])
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import Mock
+
+from freezegun import freeze_time
+
+from minilodon.burst import Burst
+
+class BurstTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = Mock()
+        self.scheduler = self.bot.reactor.scheduler
+        self.burst = Burst(self.bot, window=1.0, limit=3)
+
+    def test_single(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.assertFalse(self.burst.add(('join', 'a', 'host')))
+        with freeze_time('01-01-01 12:00:02'):
+            self.assertFalse(self.burst.add(('join', 'b', 'host')))
+        self.assertFalse(self.scheduler.execute_after.called)
+
+    def test_burst(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.assertFalse(self.burst.add(('join', 'a', 'host')))
+            self.assertTrue(self.burst.add(('join', 'b', 'host')))
+            self.assertTrue(self.burst.add(('quit', 'c')))
+        self.scheduler.execute_after.assert_called_once_with(1.0,
+                                                             self.burst.check)
+        with freeze_time('01-01-01 12:00:01'):
+            self.burst.check()
+        self.bot.on_burst.assert_called_once_with([('join', 'b', 'host'),
+                                                   ('quit', 'c')])
+        self.assertEqual(len(self.burst), 0)
+        self.assertEqual(self.burst.bursts, 1)
+        self.assertEqual(self.burst.largest, 2)
+
+    def test_window_does_not_slide(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.burst.add(('join', 'a', 'host'))
+            self.burst.add(('join', 'b', 'host'))
+        with freeze_time('01-01-01 12:00:00.5'):
+            self.burst.add(('join', 'c', 'host'))
+        with freeze_time('01-01-01 12:00:01'):
+            self.scheduler.reset_mock()
+            self.burst.check()
+        self.bot.on_burst.assert_called_once_with([('join', 'b', 'host'),
+                                                   ('join', 'c', 'host')])
+        self.assertFalse(self.scheduler.execute_after.called)
+
+    def test_steady_traffic(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.burst.add(('join', 'a', 'host'))
+        with freeze_time('01-01-01 12:00:00.8'):
+            self.burst.add(('join', 'b', 'host'))
+        with freeze_time('01-01-01 12:00:01.6'):
+            self.burst.add(('join', 'c', 'host'))
+        with freeze_time('01-01-01 12:00:01.8'):
+            self.burst.check()
+        self.bot.on_burst.assert_called_once_with([('join', 'b', 'host'),
+                                                   ('join', 'c', 'host')])
+
+    def test_limit(self):
+        with freeze_time('01-01-01 12:00:00'):
+            for nick in 'abcdef':
+                self.burst.add(('join', nick, 'host'))
+            self.scheduler.reset_mock()
+            self.burst.check()
+        self.bot.on_burst.assert_called_once_with([('join', 'b', 'host'),
+                                                   ('join', 'c', 'host'),
+                                                   ('join', 'd', 'host')])
+        self.scheduler.execute_after.assert_called_once_with(0,
+                                                             self.burst.check)
+        self.assertEqual(len(self.burst), 2)
+
+    def test_flush(self):
+        self.burst.flush()
+        self.assertFalse(self.bot.on_burst.called)
+        with freeze_time('01-01-01 12:00:00'):
+            for nick in 'abcdef':
+                self.burst.add(('join', nick, 'host'))
+        self.burst.flush()
+        self.assertEqual(len(self.bot.on_burst.call_args[0][0]), 5)
+        self.assertEqual(len(self.burst), 0)
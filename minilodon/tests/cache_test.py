@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from freezegun import freeze_time
+
+from minilodon.cache import PreviewCache, normalize_url
+
+class NormalizeTest(unittest.TestCase):
+    def test_youtu_be(self):
+        self.assertEqual(normalize_url('https://youtu.be/abc?si=xyz'),
+                         'https://youtube.com/watch?v=abc')
+
+    def test_youtube(self):
+        self.assertEqual(normalize_url('https://www.YouTube.com/watch?'
+                                       'v=abc&feature=share'),
+                         'https://youtube.com/watch?v=abc')
+
+    def test_query_order(self):
+        self.assertEqual(normalize_url('HTTP://Example.com/a?b=2&a=1#frag'),
+                         normalize_url('http://example.com/a?a=1&b=2&utm_x=y'))
+
+class PreviewCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = PreviewCache(maxsize=2, ttl=60.0, negative_ttl=10.0)
+
+    def test_miss(self):
+        self.assertEqual(self.cache.get('http://a'), (False, None))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_hit(self):
+        self.cache.put('https://youtu.be/abc', 'title')
+        self.assertEqual(self.cache.get('https://youtube.com/watch?v=abc'),
+                         (True, 'title'))
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_lru(self):
+        self.cache.put('http://a', 'a')
+        self.cache.put('http://b', 'b')
+        self.cache.get('http://a')
+        self.cache.put('http://c', 'c')
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('http://b'), (False, None))
+        self.assertEqual(self.cache.get('http://a'), (True, 'a'))
+
+    def test_ttl(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.cache.put('http://a', 'a')
+            self.cache.put('http://b', None)
+        with freeze_time('01-01-01 12:00:30'):
+            self.assertEqual(self.cache.get('http://a'), (True, 'a'))
+            self.assertEqual(self.cache.get('http://b'), (False, None))
+        with freeze_time('01-01-01 12:01:01'):
+            self.assertEqual(self.cache.get('http://a'), (False, None))
+
+    def test_negative(self):
+        self.cache.put('http://a', None)
+        self.assertEqual(self.cache.get('http://a'), (True, None))
+
+class PersistentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'previews.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_reload(self):
+        cache = PreviewCache(maxsize=2, filename=self.filename)
+        cache.put('http://a', 'a')
+        cache.put('http://b', None)
+        cache.put('http://c', 'c')
+        cache.db.close()
+        cache = PreviewCache(maxsize=2, filename=self.filename)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('http://a'), (False, None))
+        self.assertEqual(cache.get('http://b'), (True, None))
+        self.assertEqual(cache.get('http://c'), (True, 'c'))
+        cache.db.close()
@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from irc.client import Event, NickMask
+
+from minilodon.group import BotGroup
+from minilodon.minilodon import Minilodon
+from minilodon.tests.minilodon_test import CONFIG
+
+class BotGroupTest(unittest.TestCase):
+    @patch('json.load')
+    @patch('builtins.open')
+    def setUp(self, _open, _load):
+        _load.return_value = [dict(CONFIG, logdir='one'),
+                              dict(CONFIG, mainchannel='#other', logdir='two')]
+        self.group = Minilodon.create('config.json')
+        self.one, self.two = self.group.bots
+
+    def test_create(self):
+        self.assertIsInstance(self.group, BotGroup)
+        self.assertEqual(self.one.channel, '#channel')
+        self.assertEqual(self.two.channel, '#other')
+        self.assertIsNot(self.one.idle, self.two.idle)
+        self.assertEqual(self.two.logwriter.directory, 'two')
+
+    @patch('json.load')
+    @patch('builtins.open')
+    def test_default_logdir(self, _open, _load):
+        _load.return_value = [CONFIG, dict(CONFIG, nick='other'),
+                              dict(CONFIG, server='irc.other.net')]
+        one, two, three = Minilodon.create('config.json').bots
+        self.assertEqual(one.logwriter.directory,
+                         '{}-{}'.format(CONFIG['server'], CONFIG['nick']))
+        self.assertEqual(two.logwriter.directory,
+                         '{}-other'.format(CONFIG['server']))
+        self.assertEqual(three.logwriter.directory,
+                         'irc.other.net-{}'.format(CONFIG['nick']))
+
+    def test_shared_commands(self):
+        function = Mock()
+        self.group.command('command')(function)
+        self.group.message()(function)
+        self.assertEqual(self.two.commands['command'], function)
+        self.assertEqual(self.two.on_message, [function])
+
+    def test_current(self):
+        self.assertEqual(self.group.channel, '#channel')
+        self.two.on_test = Mock()
+        event = Event(type='test', source=NickMask('nick!user@host'),
+                      target='#other')
+        self.two._dispatcher(self.two.connection, event)
+        self.two.on_test.assert_called_once_with(self.two.connection, event)
+        self.assertIs(self.group.current, self.two)
+        self.assertEqual(self.group.channel, '#other')
+
+    def test_process_once(self):
+        for bot in self.group:
+            bot.reactor = Mock(sockets=[])
+        self.group.process_once()
+        for bot in self.group:
+            bot.reactor.process_timeout.assert_called_once_with()
+
+    def test_process_once_sockets(self):
+        sock = Mock()
+        self.one.reactor = Mock(sockets=[sock])
+        self.two.reactor = Mock(sockets=[])
+        with patch('select.select', return_value=([sock], [], [])):
+            self.group.process_once()
+        self.one.reactor.process_data.assert_called_once_with([sock])
+
+    @patch('json.load')
+    @patch('builtins.open')
+    def test_mixed(self, _open, _load):
+        _load.return_value = [CONFIG, dict(CONFIG, asyncio=True)]
+        with self.assertRaises(ValueError):
+            Minilodon.create('config.json')
+
+    def test_die(self):
+        for bot in self.group:
+            bot.logwriter = Mock()
+            bot.connection = Mock()
+        self.two.rotator = Mock()
+        with self.assertRaises(SystemExit):
+            self.group.die()
+        self.two.rotator.stop.assert_called_once_with()
+        for bot in self.group:
+            bot.logwriter.stop.assert_called_once_with()
+            bot.connection.disconnect.assert_called_once_with('Bye, cruel world!')
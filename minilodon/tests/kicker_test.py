@@ -1,54 +1,149 @@
+import os
+import shutil
+import tempfile
 import unittest
 from unittest.mock import Mock
-from threading import Event
 
-import irc
+from freezegun import freeze_time
 
-from minilodon.kicker import Kicker
+from minilodon.kicker import IdleTracker, load_snapshot, save_snapshot
 from minilodon.minilodon import Minilodon
 
 class KickerTest(unittest.TestCase):
     def setUp(self):
         self.bot = Mock(spec=Minilodon)
         self.bot.connection = Mock()
-        self.channel = '#test'
-        self.nick = 'nick'
+        self.bot.reactor = Mock()
+        self.scheduler = self.bot.reactor.scheduler
         self.idletime = 10.0
-        self.resetter = Mock(spec=Event)
-        self.kicker = Kicker(self.bot, self.channel, self.nick, self.idletime)
-        self.kicker.resetter = self.resetter
-
-    def test_run_once(self):
-        self.resetter.isSet.return_value = False
-        self.kicker.run()
-        self.assertEqual(self.bot.connection.kick.call_count, 1)
-        self.assertEqual(self.bot.connection.kick.call_args[0][0], self.channel)
-        self.assertEqual(self.bot.connection.kick.call_args[0][1], self.nick)
-        self.assertEqual(self.bot.send_msg.call_count, 1)
-        self.assertEqual(self.bot.send_msg.call_args[0][1], True)
-        self.bot.reset_mock()
-
-    def test_run_twice(self):
-        self.resetter.isSet.side_effect = [True, False]
-        self.kicker.run()
-        self.resetter.clear.assert_called_once_with()
-        self.bot.reset_mock()
+        self.tracker = IdleTracker(self.bot, self.idletime)
 
-    def test_cancel(self):
-        def wait(time):
-            self.kicker.cancel()
-        self.resetter.isSet.side_effect = lambda: self.resetter.set.called
-        self.resetter.wait.side_effect = wait
-        self.kicker.run()
-        assert(not self.bot.connection.kick.called)
-        assert(self.resetter.clear.called)
+    def assertScheduled(self, delay):
+        args = self.scheduler.execute_after.call_args[0]
+        self.assertEqual(args[0], delay)
+        self.assertEqual(args[1].func, self.tracker.check)
+
+    @freeze_time('01-01-01 12:00:00')
+    def test_add(self):
+        kicker = self.tracker.add('nick')
+        self.assertEqual(kicker.nick, 'nick')
+        self.assertEqual(len(self.tracker), 1)
+        self.assertScheduled(self.idletime)
+        self.tracker.add('nick2')
+        self.assertEqual(self.scheduler.execute_after.call_count, 1)
+
+    def test_expire(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.tracker.add('nick')
+        with freeze_time('01-01-01 12:00:10'):
+            self.tracker.check()
+        self.bot.kick.assert_called_once_with('nick', 'Idle too long!',
+                                              'Kicked nick due to inactivity.')
+        self.assertEqual(len(self.tracker), 0)
 
     def test_reset(self):
-        self.kicker.reset()
-        self.assertTrue(self.resetter.set.called)
+        with freeze_time('01-01-01 12:00:00'):
+            kicker = self.tracker.add('nick')
+            other = self.tracker.add('other')
+        with freeze_time('01-01-01 12:00:05'):
+            kicker.reset()
+        with freeze_time('01-01-01 12:00:10'):
+            self.scheduler.reset_mock()
+            self.tracker.check()
+        self.bot.kick.assert_called_once_with('other', 'Idle too long!',
+                                              'Kicked other due to inactivity.')
+        self.assertEqual(self.scheduler.execute_after.call_count, 1)
+        self.assertScheduled(5.0)
+        self.assertTrue(other.canceled)
+        self.assertFalse(kicker.canceled)
+
+    def test_cancel(self):
+        with freeze_time('01-01-01 12:00:00'):
+            kicker = self.tracker.add('nick')
+        kicker.cancel()
+        with freeze_time('01-01-01 12:00:10'):
+            self.tracker.check()
+            kicker.reset()
+        self.assertFalse(self.bot.kick.called)
+        self.assertEqual(len(self.tracker), 0)
 
     def test_changenick(self):
-        self.kicker.changenick('newnick')
-        self.assertFalse(self.resetter.set.called)
-        self.assertEqual(self.kicker.nick, 'newnick')
-        self.kicker.changenick('nick')
+        kicker = self.tracker.add('nick')
+        kicker.changenick('newnick')
+        self.assertEqual(kicker.nick, 'newnick')
+
+    def test_many(self):
+        kickers = [self.tracker.add('nick{}'.format(i)) for i in range(10000)]
+        for kicker in kickers:
+            kicker.reset()
+        self.assertEqual(len(self.tracker), 10000)
+
+    def test_pause(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.tracker.add('nick')
+            self.tracker.pause()
+        with freeze_time('01-01-01 12:00:10'):
+            self.tracker.check()
+            self.assertFalse(self.bot.kick.called)
+            self.tracker.resume()
+            self.assertScheduled(0)
+            self.tracker.check()
+        self.bot.kick.assert_called_once_with('nick', 'Idle too long!',
+                                              'Kicked nick due to inactivity.')
+
+    def test_stale_check(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.tracker.add('nick')
+            for _ in range(10):
+                self.tracker.pause()
+                self.tracker.check()
+                self.tracker.resume()
+        callbacks = [call[0][1]
+                     for call in self.scheduler.execute_after.call_args_list]
+        self.assertEqual(len(callbacks), 11)
+        self.scheduler.reset_mock()
+        with freeze_time('01-01-01 12:00:05'):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.scheduler.execute_after.call_count, 1)
+        self.assertScheduled(5.0)
+
+    def test_snapshot(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.tracker.add('Nick')
+        self.assertEqual(self.tracker.snapshot(), {'Nick': 978350400})
+
+    def test_restore(self):
+        with freeze_time('01-01-01 12:00:00'):
+            first = self.tracker.add('first')
+            second = self.tracker.add('second')
+            third = self.tracker.add('third')
+            self.tracker.restore({'Second': 978350395, 'other': 0})
+        self.assertEqual(second.time, 978350395)
+        self.assertEqual(list(self.tracker.kickers), [second, first, third])
+        self.assertScheduled(5.0)
+        with freeze_time('01-01-01 12:00:05'):
+            self.tracker.check()
+        self.bot.kick.assert_called_once_with('second', 'Idle too long!',
+                                              'Kicked second due to inactivity.')
+
+class SnapshotTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'idle.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_roundtrip(self):
+        save_snapshot(self.filename, {'nick': 1000})
+        self.assertEqual(load_snapshot(self.filename), {'nick': 1000})
+        self.assertFalse(os.path.exists(self.filename + '.tmp'))
+
+    def test_missing(self):
+        self.assertEqual(load_snapshot(self.filename), {})
+
+    def test_corrupt(self):
+        with open(self.filename, 'w') as snapshot_file:
+            snapshot_file.write('{"nick"')
+        self.assertEqual(load_snapshot(self.filename), {})
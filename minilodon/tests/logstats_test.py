@@ -0,0 +1,79 @@
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from minilodon import logstats
+
+LOG = (b"01-01-01 12:00:00 <alice> hello\n"
+       b"01-01-01 12:00:05 bob [u@h] joined #test\n"
+       b"01-01-01 13:00:00 <bob> hi\n"
+       b"01-01-01 13:30:00 <alice> again\n"
+       b"01-01-01 14:00:00 <bot> Kicked bob due to inactivity.\n"
+       b"01-01-01 14:00:01 <bob> not a kick: Kicked x due to inactivity")
+
+class LogStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.dir, '#test'))
+        self.path = os.path.join(self.dir, '#test', '01-01-01-#test.log')
+        with open(self.path, 'wb') as logfile:
+            logfile.write(LOG)
+        open(os.path.join(self.dir, '#test', '01-01-02-#test.log'),
+             'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_scan(self):
+        messages, heatmap, kicks = logstats.scan(LOG)
+        self.assertEqual(messages, {('2001-01-01', 'alice'): 2,
+                                    ('2001-01-01', 'bob'): 2,
+                                    ('2001-01-01', 'bot'): 1})
+        self.assertEqual(heatmap, {(0, 12): 1, (0, 13): 2, (0, 14): 2})
+        self.assertEqual(kicks, {('2001-01-01', 'bob'): 1})
+
+    def test_bad_date(self):
+        messages, _, _ = logstats.scan(b"99-99-01 12:00:00 <alice> x\n")
+        self.assertEqual(messages, {})
+
+    def test_find_logs(self):
+        self.assertEqual(len(logstats.find_logs([self.dir])), 2)
+        open(os.path.join(self.dir, '#test', 'notes.txt'), 'w').close()
+        self.assertEqual(len(logstats.find_logs([self.dir])), 2)
+        self.assertEqual(logstats.find_logs([self.path]), [self.path])
+
+    def test_collect(self):
+        messages, _, kicks = logstats.collect([self.dir, self.path], 1)
+        self.assertEqual(messages[('2001-01-01', 'alice')], 4)
+        self.assertEqual(kicks[('2001-01-01', 'bob')], 2)
+
+    def test_csv(self):
+        out = io.StringIO()
+        logstats.write_csv(logstats.scan(LOG), 'kicks', out)
+        self.assertEqual(out.getvalue().splitlines(),
+                         ['date,nick,kicks', '2001-01-01,bob,1'])
+        out = io.StringIO()
+        logstats.write_csv(logstats.scan(LOG), 'heatmap', out)
+        self.assertEqual(out.getvalue().splitlines()[:2],
+                         ['weekday,hour,messages', '0,12,1'])
+
+    def test_json(self):
+        out = io.StringIO()
+        logstats.write_json(logstats.scan(LOG), out)
+        result = json.loads(out.getvalue())
+        self.assertEqual(result['messages']['2001-01-01']['alice'], 2)
+        self.assertEqual(result['kicks'], {'2001-01-01': {'bob': 1}})
+        self.assertEqual(result['heatmap'][0][13], 2)
+        self.assertEqual(len(result['heatmap']), 7)
+
+    def test_compressed(self):
+        path = os.path.join(self.dir, '#test', '01-01-03-#test.log.gz')
+        with gzip.open(path, 'wb') as gzfile:
+            gzfile.write(LOG)
+        self.assertIn(path, logstats.find_logs([self.dir]))
+        messages, _, _ = logstats.scan_file(path)
+        self.assertEqual(messages[('2001-01-01', 'alice')], 2)
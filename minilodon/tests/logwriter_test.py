@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from minilodon.logwriter import Clock, LogWriter
+
+def _timestamp(*args):
+    return datetime(*args).timestamp()
+
+class LogWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.writer = LogWriter(flush_interval=60.0, batch_size=2)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir)
+
+    def read(self, filename):
+        with open(filename) as logfile:
+            return logfile.read()
+
+    def test_write(self):
+        self.writer.write('#test', 'msg', _timestamp(2001, 1, 1, 12))
+        self.writer.stop()
+        self.assertEqual(self.read('#test/01-01-01-#test.log'),
+                         '01-01-01 12:00:00 msg\n')
+
+    def test_batch(self):
+        self.writer.handle(('write', '#test', _timestamp(2001, 1, 1, 12), 'a'))
+        self.assertEqual(self.writer.pending, 1)
+        self.assertEqual(self.read('#test/01-01-01-#test.log'), '')
+        self.writer.handle(('write', '#test', _timestamp(2001, 1, 1, 12), 'b'))
+        self.assertEqual(self.writer.pending, 0)
+        self.assertEqual(self.read('#test/01-01-01-#test.log'),
+                         '01-01-01 12:00:00 a\n01-01-01 12:00:00 b\n')
+        self.writer.shutdown()
+
+    def test_rotate(self):
+        self.writer.write('#test', 'a', _timestamp(2001, 1, 1, 23, 59, 59))
+        self.writer.write('#test', 'b', _timestamp(2001, 1, 2))
+        self.writer.stop()
+        self.assertEqual(self.read('#test/01-01-01-#test.log'),
+                         '01-01-01 23:59:59 a\n')
+        self.assertEqual(self.read('#test/01-01-02-#test.log'),
+                         '02-01-01 00:00:00 b\n')
+
+    def test_rotate_same_day_of_month(self):
+        self.writer.write('#test', 'a', _timestamp(2001, 1, 5, 12))
+        self.writer.write('#test', 'b', _timestamp(2001, 2, 5, 12))
+        self.writer.stop()
+        self.assertEqual(self.read('#test/01-01-05-#test.log'),
+                         '05-01-01 12:00:00 a\n')
+        self.assertEqual(self.read('#test/01-02-05-#test.log'),
+                         '05-02-01 12:00:00 b\n')
+
+    @patch('os.fsync')
+    def test_fsync(self, _fsync):
+        self.writer.fsync = True
+        self.writer.write('#test', 'a', _timestamp(2001, 1, 1))
+        self.writer.close('#test')
+        self.writer.stop()
+        self.assertEqual(_fsync.call_count, 1)
+        self.assertEqual(self.writer.files, {})
+
+    def test_thread_drain(self):
+        self.writer.start()
+        for i in range(5):
+            self.writer.write('#test', str(i), _timestamp(2001, 1, 1))
+        self.writer.stop()
+        self.assertFalse(self.writer.is_alive())
+        lines = self.read('#test/01-01-01-#test.log').splitlines()
+        self.assertEqual(len(lines), 5)
+
+class ClockTest(unittest.TestCase):
+    def setUp(self):
+        self.tz = os.environ.get('TZ')
+
+    def tearDown(self):
+        if self.tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = self.tz
+        time.tzset()
+
+    def check(self, start, stop, step):
+        clock = Clock()
+        timestamp = start
+        while timestamp < stop:
+            expected = datetime.fromtimestamp(timestamp).strftime(
+                "%d-%m-%y %H:%M:%S")
+            self.assertEqual(clock.format(timestamp), expected)
+            timestamp += step
+
+    def test_format(self):
+        start = _timestamp(2001, 1, 1, 23, 58)
+        self.check(start, start + 240, 0.25)
+
+    def test_backwards(self):
+        clock = Clock()
+        clock.format(_timestamp(2001, 1, 2, 0, 0, 1))
+        self.assertEqual(clock.format(_timestamp(2001, 1, 1, 23, 59, 59)),
+                         '01-01-01 23:59:59')
+
+    @unittest.skipUnless(hasattr(time, 'tzset'), 'requires time.tzset')
+    def test_dst(self):
+        os.environ['TZ'] = 'Europe/Amsterdam'
+        time.tzset()
+        start = _timestamp(2016, 3, 26, 12)
+        self.check(start, start + 2 * 86400, 61)
+        start = _timestamp(2016, 10, 29, 12)
+        self.check(start, start + 2 * 86400, 61)
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from minilodon import metrics
+from minilodon.metrics import Registry
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_counter(self):
+        counter = self.registry.counter('events_total', 'Events.')
+        counter.inc(event='join')
+        counter.inc(2, event='join')
+        counter.inc(event='pubmsg')
+        self.assertIs(self.registry.counter('events_total', 'Events.'),
+                      counter)
+        lines = self.registry.render().splitlines()
+        self.assertEqual(lines, ['# HELP events_total Events.',
+                                 '# TYPE events_total counter',
+                                 'events_total{event="join"} 3',
+                                 'events_total{event="pubmsg"} 1'])
+
+    def test_histogram(self):
+        histogram = self.registry.histogram('latency_seconds', 'Latency.',
+                                            (0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(2.0)
+        lines = self.registry.render().splitlines()
+        self.assertEqual(lines[2:], ['latency_seconds_bucket{le="0.1"} 1',
+                                     'latency_seconds_bucket{le="1.0"} 2',
+                                     'latency_seconds_bucket{le="+Inf"} 3',
+                                     'latency_seconds_sum 2.55',
+                                     'latency_seconds_count 3'])
+
+    def test_collectors(self):
+        self.registry.register(lambda: [('queued', {'network': 'a'}, 1),
+                                        ('kicks_total', {'network': 'a'}, 2)])
+        self.registry.register(lambda: [('queued', {'network': 'b'}, 3)])
+        lines = self.registry.render().splitlines()
+        self.assertEqual(lines, ['# TYPE queued gauge',
+                                 'queued{network="a"} 1',
+                                 'queued{network="b"} 3',
+                                 '# TYPE kicks_total counter',
+                                 'kicks_total{network="a"} 2'])
+
+    def test_escape(self):
+        self.registry.register(lambda: [('queued', {'nick': 'a"b'}, 1)])
+        self.assertIn('queued{nick="a\\"b"} 1', self.registry.render())
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        self.registry.counter('events_total', 'Events.').inc()
+
+    def test_serve(self):
+        server = metrics.serve(0, registry=self.registry)
+        url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+        try:
+            with urlopen(url + '/metrics') as response:
+                body = response.read().decode('utf-8')
+            self.assertIn('events_total 1', body)
+            with self.assertRaises(HTTPError):
+                urlopen(url + '/other')
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'metrics.prom')
+            metrics.dump(filename, self.registry)
+            with open(filename) as metrics_file:
+                self.assertIn('events_total 1', metrics_file.read())
+        finally:
+            shutil.rmtree(directory)
@@ -1,12 +1,11 @@
 import itertools
+import time
 import unittest
 from unittest.mock import Mock, MagicMock, patch
 
 from irc.client import Event, NickMask
-from freezegun import freeze_time
 
 from minilodon.minilodon import Minilodon
-from minilodon.kicker import Kicker
 
 CONFIG = {
     'server': 'server',
@@ -37,10 +36,23 @@ class MinilodonTest(unittest.TestCase):
         self.connection.nick.assert_called_once_with('nick_')
 
     def test_disconnect(self):
-        with self.assertRaises(Exception) as cm:
-            self.bot.on_disconnect(self.connection, self.event)
-        error = cm.exception
-        self.assertEqual(str(error), 'Disconnected by nick!user@host (arg1 arg2)')
+        self.bot.idle = Mock()
+        self.bot.on_disconnect(self.connection, self.event)
+        self.bot.idle.pause.assert_called_once_with()
+
+    def test_welcome_resets_backoff(self):
+        recon = self.bot.recon
+        self.bot.rejoins = {'#channel': 3}
+        self.bot.on_welcome(self.connection, self.event)
+        self.assertIsNot(self.bot.recon, recon)
+        self.assertEqual(self.bot.rejoins, {})
+
+    def test_welcome_extrachannels(self):
+        self.bot.password = None
+        self.bot.extrachannels = ['#extra']
+        self.bot.on_welcome(self.connection, self.event)
+        self.assertEqual(self.connection.join.call_count, 3)
+        self.connection.join.assert_called_with('#extra')
 
     def test_welcome_with_password(self):
         self.bot.send_priv_msg = Mock()
@@ -121,13 +133,11 @@ class MinilodonTest(unittest.TestCase):
         self.bot.log.assert_called_once_with('#channel', 'nick arg1 arg2')
         self.bot.on_pubmsg_main.assert_called_once_with(self.event)
 
-    @patch('minilodon.util.open_log_file')
-    def test_join_self(self, _open):
-        self.bot.logs = {}
-        _open.return_value = 'sentinel'
+    def test_join_self(self):
+        self.bot.logs = set()
         self.bot.send_msg = Mock()
         self.bot.on_join(self.connection, self.event)
-        self.assertEqual(self.bot.logs['target'], 'sentinel')
+        self.assertEqual(self.bot.logs, {'target'})
         self.bot.send_msg.assert_called_once_with('Joined target', True)
 
     def test_join_unalone(self):
@@ -137,11 +147,10 @@ class MinilodonTest(unittest.TestCase):
         self.event.target = '#channel'
         self.bot.log = Mock()
         self.bot.add_kicker = Mock()
-        channel = Mock()
-        channel.users = Mock(return_value=['user1', 'user2'])
-        self.bot.channels = {'#channel': channel}
+        self.bot.roster.add('user1')
         self.bot.on_join(self.connection, self.event)
         self.bot.log.assert_called_once_with('#channel', 'user2 [user@host] joined #channel')
+        self.assertEqual(self.bot.roster.count, 2)
         self.bot.add_kicker.assert_any_call('user1')
         self.bot.add_kicker.assert_any_call('user2')
         self.assertEqual(self.bot.alone, '')
@@ -153,14 +162,52 @@ class MinilodonTest(unittest.TestCase):
         self.event.target = '#channel'
         self.bot.log = Mock()
         self.bot.add_kicker = Mock()
-        channel = Mock()
-        channel.users = Mock(return_value=['user1'])
-        self.bot.channels = {'#channel': channel}
+        self.bot.roster.add('nick')
+        self.bot.roster.add('ChanServ')
         self.bot.on_join(self.connection, self.event)
         self.bot.log.assert_called_once_with('#channel', 'user1 [user@host] joined #channel')
         self.assertEqual(self.bot.alone, 'user1')
         self.assertFalse(self.bot.add_kicker.called)
 
+    def test_join_burst(self):
+        self.bot.burst = Mock()
+        self.bot.burst.add.return_value = True
+        self.bot.log = Mock()
+        self.event.source = NickMask.from_params('user1', 'user', 'host')
+        self.event.target = '#channel'
+        self.bot.on_join(self.connection, self.event)
+        self.bot.burst.add.assert_called_once_with(('join', 'user1', 'user@host'))
+        self.assertFalse(self.bot.log.called)
+
+    def test_burst(self):
+        self.bot.log = Mock()
+        self.bot.add_kicker = Mock()
+        self.bot.remove_kicker = Mock()
+        self.bot.roster.add('user3')
+        self.bot.on_burst([('join', 'user1', 'host1'), ('join', 'user2', 'host2'),
+                           ('quit', 'user3')])
+        self.bot.log.assert_any_call('#channel', '2 users joined #channel: user1 user2')
+        self.bot.log.assert_any_call('#channel', 'user3 quit')
+        self.bot.remove_kicker.assert_called_once_with('user3')
+        self.bot.add_kicker.assert_any_call('user1')
+        self.bot.add_kicker.assert_any_call('user2')
+        self.assertEqual(self.bot.roster.count, 2)
+        self.assertEqual(self.bot.alone, '')
+
+    def test_burst_alone(self):
+        self.bot.log = Mock()
+        self.bot.add_kicker = Mock()
+        self.bot.remove_kicker = Mock()
+        self.bot.alone = 'user1'
+        self.bot.roster.add('user1')
+        self.bot.on_burst([('join', 'user2', 'host2'), ('quit', 'user1'),
+                           ('quit', 'user3')])
+        self.bot.log.assert_any_call('#channel', 'user2 [host2] joined #channel')
+        self.bot.log.assert_any_call('#channel', '2 users quit: user1 user3')
+        self.assertEqual(self.bot.alone, 'user2')
+        self.assertFalse(self.bot.add_kicker.called)
+        self.bot.remove_kicker.assert_called_with('user2')
+
     def test_namreply_alone(self):
         self.bot.alone = None
         self.event.arguments = ['', '#channel', ' @chanserv user1']
@@ -173,6 +220,19 @@ class MinilodonTest(unittest.TestCase):
         self.bot.on_namreply(self.connection, self.event)
         self.bot.add_kicker.assert_any_call('user1')
         self.bot.add_kicker.assert_any_call('user2')
+        self.assertEqual(self.bot.roster.count, 2)
+
+    def test_namreply_split(self):
+        self.bot.alone = ''
+        self.bot.add_kicker = Mock()
+        self.event.arguments = ['', '#channel', '@nick +user1']
+        self.bot.on_namreply(self.connection, self.event)
+        self.assertEqual(self.bot.alone, 'user1')
+        self.event.arguments = ['', '#channel', 'user2']
+        self.bot.on_namreply(self.connection, self.event)
+        self.assertEqual(self.bot.alone, '')
+        self.bot.add_kicker.assert_any_call('user1')
+        self.bot.add_kicker.assert_any_call('user2')
 
     def test_banned(self):
         self.bot.extrachannels = ['arg1']
@@ -183,27 +243,36 @@ class MinilodonTest(unittest.TestCase):
 
     def test_part_self(self):
         self.bot.send_msg = Mock()
-        log = Mock()
-        self.bot.logs = {'target': log}
+        self.bot.logwriter = Mock()
+        self.bot.logs = {'target'}
         self.bot.on_part(self.connection, self.event)
         self.bot.send_msg.assert_called_once_with('Left target', True)
-        log.close.assert_called_once_with()
-        self.assertEqual(self.bot.logs, {})
+        self.bot.logwriter.close.assert_called_once_with('target')
+        self.assertEqual(self.bot.logs, set())
 
     def test_part_other(self):
         mask = NickMask.from_params('victim', 'user', 'host')
         self.event.source = mask
+        self.event.target = '#channel'
         self.bot.on_leave = Mock()
         self.bot.log = Mock()
         self.bot.on_part(self.connection, self.event)
         self.bot.on_leave.assert_called_once_with('victim')
+        self.bot.log.assert_called_once_with('#channel', 'victim left #channel')
+
+    def test_part_other_channel(self):
+        mask = NickMask.from_params('victim', 'user', 'host')
+        self.event.source = mask
+        self.bot.on_leave = Mock()
+        self.bot.log = Mock()
+        self.bot.on_part(self.connection, self.event)
+        self.assertFalse(self.bot.on_leave.called)
         self.bot.log.assert_called_once_with('target', 'victim left target')
 
     def test_leave(self):
         self.bot.alone = 'user2'
-        channel = Mock()
-        channel.users = Mock(return_value=['user1'])
-        self.bot.channels = {'#channel': channel}
+        self.bot.roster.add('user1')
+        self.bot.roster.add('user2')
         self.bot.remove_kicker = Mock()
         self.bot.on_leave('user2')
         self.assertEqual(self.bot.alone, 'user1')
@@ -222,21 +291,124 @@ class MinilodonTest(unittest.TestCase):
     def test_kick_self_main(self):
         self.event.target = '#channel'
         self.event.arguments = ['nick', 'rea', 'son']
-        with self.assertRaises(Exception) as cm:
-            self.bot.on_kick(self.connection, self.event)
-        error = cm.exception
-        self.assertEqual(str(error), 'Kicked from #channel by nick (rea son)')
+        self.bot.send_msg = Mock()
+        self.bot.rejoin = Mock()
+        self.bot.idle = Mock()
+        self.bot.on_kick(self.connection, self.event)
+        self.bot.send_msg.assert_called_once_with(
+            'Kicked from #channel by nick (rea son)', True)
+        self.bot.idle.pause.assert_called_once_with()
+        self.bot.rejoin.assert_called_once_with('#channel')
+
+    def test_kick_self_control(self):
+        self.event.target = '#controlchannel'
+        self.event.arguments = ['nick', 'rea', 'son']
+        self.bot.send_msg = Mock()
+        self.bot.rejoin = Mock()
+        self.bot.on_kick(self.connection, self.event)
+        self.assertFalse(self.bot.send_msg.called)
+        self.bot.rejoin.assert_called_once_with('#controlchannel')
+
+    @patch('random.uniform', Mock(return_value=1.0))
+    def test_rejoin(self):
+        self.bot.reactor = Mock()
+        self.bot.rejoin('#channel')
+        self.bot.rejoin('#channel')
+        calls = self.bot.reactor.scheduler.execute_after.call_args_list
+        self.assertEqual([call[0][0] for call in calls], [2, 4])
+        self.connection.is_connected.return_value = False
+        calls[0][0][1]()
+        self.assertFalse(self.connection.join.called)
+        self.connection.is_connected.return_value = True
+        calls[0][0][1]()
+        self.connection.join.assert_called_once_with('#channel')
+
+    def test_restore_idle(self):
+        self.bot.idle = Mock()
+        self.bot.restored = {'user1': 1000}
+        self.bot.names = set()
+        end = Event(type=None, source='server', target='nick',
+                    arguments=['#channel', 'End of /NAMES list.'])
+        self.bot.on_endofnames(self.connection, end)
+        self.bot.idle.restore.assert_called_once_with({'user1': 1000})
+        self.bot.idle.resume.assert_called_once_with()
+        self.assertEqual(self.bot.restored, {})
+
+    @patch('minilodon.minilodon.save_snapshot')
+    def test_save_idle(self, _save):
+        self.bot.save_idle()
+        self.assertFalse(_save.called)
+        self.bot.idlestate = 'idle.json'
+        self.bot.idle = Mock()
+        self.bot.idle.snapshot.return_value = {'user1': 1000}
+        self.bot.save_idle()
+        _save.assert_called_once_with('idle.json', {'user1': 1000})
+
+    @patch('minilodon.minilodon.save_snapshot')
+    def test_save_idle_before_restore(self, _save):
+        self.bot.idlestate = 'idle.json'
+        self.bot.restored = {'user1': 1000}
+        self.bot.save_idle()
+        self.assertFalse(_save.called)
+
+    def test_prepare(self):
+        self.bot.logwriter = Mock()
+        self.bot.reactor = Mock()
+        self.bot.idlestate = 'idle.json'
+        self.bot.prepare()
+        self.bot.logwriter.start.assert_called_once_with()
+        self.bot.reactor.scheduler.execute_every.assert_called_once_with(
+            60.0, self.bot.save_idle)
+
+    def test_collect(self):
+        self.bot.network = 'server'
+        self.bot.roster.add('user1')
+        samples = dict((name, value) for name, labels, value
+                       in self.bot.collect())
+        self.assertEqual(samples['minilodon_roster_users'], 1)
+        self.assertEqual(samples['minilodon_outbound_queued'], 0)
+        self.assertEqual(samples['minilodon_kickers'], 0)
+
+    def test_banned_main(self):
+        self.event.arguments = ['#channel']
+        self.bot.send_msg = Mock()
+        self.bot.rejoin = Mock()
+        self.bot.on_bannedfromchan(self.connection, self.event)
+        self.bot.rejoin.assert_called_once_with('#channel')
+
+    def test_rejoin_reconcile(self):
+        self.bot.idle = Mock()
+        self.bot.send_msg = Mock()
+        self.bot.log = Mock()
+        self.bot.kickers = {'user1': Mock(), 'user2': Mock()}
+        self.bot.roster.add('user1')
+        self.bot.roster.add('user2')
+        self.event.target = '#channel'
+        self.bot.on_join(self.connection, self.event)
+        names = Event(type=None, source='server', target='nick',
+                      arguments=['=', '#channel', 'nick @user1 user3'])
+        self.bot.on_namreply(self.connection, names)
+        end = Event(type=None, source='server', target='nick',
+                    arguments=['#channel', 'End of /NAMES list.'])
+        self.bot.on_endofnames(self.connection, end)
+        self.assertIn('user1', self.bot.roster)
+        self.assertIn('user3', self.bot.roster)
+        self.assertNotIn('user2', self.bot.roster)
+        self.assertNotIn('user2', self.bot.kickers)
+        self.assertIn('user3', self.bot.kickers)
+        self.bot.idle.resume.assert_called_once_with()
+        self.assertIsNone(self.bot.names)
 
     def test_kick_self_other(self):
         self.event.arguments = ['nick', 'rea', 'son']
         self.bot.send_msg = Mock()
-        log = Mock()
-        self.bot.logs = {'target': log}
+        self.bot.logwriter = Mock()
+        self.bot.logs = {'target'}
         self.bot.extrachannels = ['target']
         self.bot.on_kick(self.connection, self.event)
         self.bot.send_msg.assert_called_once_with('Kicked from target by nick (rea son)', True)
-        log.close.assert_called_once_with()
-        self.assertEqual(self.bot.logs, {})
+        self.bot.logwriter.close.assert_called_once_with('target')
+        self.assertEqual(self.bot.logs, set())
         self.assertEqual(self.bot.extrachannels, [])
 
     def test_kick_other(self):
@@ -279,16 +451,23 @@ class MinilodonTest(unittest.TestCase):
         self.assertEqual(self.bot.extrachannels, [])
         self.connection.part.assert_called_once_with('#target')
 
-    @patch('minilodon.kicker.Kicker')
-    def test_add_kicker_self(self, _kicker):
+    def test_add_kicker_self(self):
+        self.bot.idle = Mock()
         self.bot.add_kicker('nick')
-        self.assertFalse(_kicker.called)
+        self.assertFalse(self.bot.idle.add.called)
 
-    @patch('minilodon.kicker.Kicker')
-    def test_add_kicker_existing(self, _kicker):
+    def test_add_kicker_existing(self):
+        self.bot.idle = Mock()
         self.bot.kickers = {'victim': 'sentinel'}
         self.bot.add_kicker('victim')
-        self.assertFalse(_kicker.called)
+        self.assertFalse(self.bot.idle.add.called)
+
+    def test_add_kicker(self):
+        self.bot.idle = Mock()
+        self.bot.idle.add.return_value = 'sentinel'
+        self.bot.add_kicker('Victim')
+        self.bot.idle.add.assert_called_once_with('Victim')
+        self.assertEqual(self.bot.kickers, {'victim': 'sentinel'})
 
     def test_get_idle_times(self):
         kicker = Mock(nick='victim', time=1)
@@ -300,7 +479,9 @@ class MinilodonTest(unittest.TestCase):
     def test_nick(self):
         kicker = Mock()
         self.bot.kickers = {'nick': kicker}
+        self.bot.roster.add('nick')
         self.bot.on_nick(self.connection, self.event)
+        self.assertIn('target', self.bot.roster)
         kicker.changenick.assert_called_once_with('target')
         self.assertEqual(self.bot.kickers, {'target': kicker})
 
@@ -323,13 +504,13 @@ class MinilodonTest(unittest.TestCase):
 
     def test_command(self):
         command = Mock()
-        self.bot.commands = {'command': command}
+        self.bot.commands['command'] = command
         result = self.bot.do_command(self.event, 'command arg1')
         command.assert_called_once_with('nick', ['command', 'arg1'])
 
     def test_control_command(self):
         command = Mock()
-        self.bot.control_commands = {'command': command}
+        self.bot.control_commands['command'] = command
         result = self.bot.do_control_command(self.event, 'command arg1')
         command.assert_called_once_with('nick', ['command', 'arg1'])
 
@@ -337,33 +518,76 @@ class MinilodonTest(unittest.TestCase):
         self.bot.kick('victim', 'reason')
         self.connection.kick.assert_called_once_with('#channel', 'victim', 'reason')
 
+    def test_kick_notice(self):
+        self.bot.log = Mock()
+        self.bot.reactor = Mock()
+        self.bot.outbound.tokens = 0
+        self.bot.outbound.updated = time.time()
+        self.bot.send_msg('chatter', True)
+        self.bot.kick('victim', 'reason', 'Kicked victim.')
+        self.bot.outbound.tokens = 2
+        self.bot.outbound.updated = time.time()
+        self.bot.outbound.pump()
+        self.connection.kick.assert_called_once_with('#channel', 'victim',
+                                                     'reason')
+        self.connection.privmsg.assert_called_once_with('#controlchannel',
+                                                        'Kicked victim.')
+        self.bot.log.assert_called_once_with('#controlchannel',
+                                             '<nick> Kicked victim.')
+
     def test_log_unjoined(self):
         self.bot.logger = Mock()
         self.bot.log('#TargeT', 'msg')
         self.bot.logger.warning.assert_called_once()
 
-    @freeze_time('01-01-01 12:00')
     def test_log(self):
-        logfile = Mock(day=0)
-        logfile2 = Mock(day=1)
-        def reopen_logs():
-            self.bot.logs = {'#channel': logfile2}
-        self.bot.logs = {'#channel': logfile}
-        self.bot.reopen_logs = Mock(side_effect=reopen_logs)
-        self.bot.log('#channel', 'msg')
-        self.bot.reopen_logs.assert_called_once_with()
-        logfile2.write.assert_called_once_with('01-01-01 12:00:00 msg\n')
-
-    @patch('minilodon.util.open_log_file')
-    def test_reopen(self, _open_log_file):
-        oldfile = Mock()
-        newfile = Mock()
-        self.bot.logs = {'#channel': oldfile}
-        _open_log_file.return_value = newfile
-        self.bot.reopen_logs()
-        _open_log_file.assert_called_once_with('#channel')
-        oldfile.close.assert_called_once_with()
-        self.assertEqual(self.bot.logs, {'#channel': newfile})
+        self.bot.logwriter = Mock()
+        self.bot.logs = {'#channel'}
+        self.bot.log('#Channel', 'msg')
+        self.bot.logwriter.write.assert_called_once_with('#channel', 'msg')
+
+    def test_die(self):
+        self.bot.logwriter = Mock()
+        self.bot.rotator = Mock()
+        self.bot.rotator.stop.side_effect = \
+            lambda: self.bot.logwriter.stop.assert_called_once_with()
+        with self.assertRaises(SystemExit):
+            self.bot.die()
+        self.bot.rotator.stop.assert_called_once_with()
+        self.connection.disconnect.assert_called_once_with('Bye, cruel world!')
+
+    def test_call_soon(self):
+        self.bot.reactor = MagicMock()
+        func = Mock()
+        self.bot.call_soon(func, 'arg')
+        scheduler = self.bot.reactor.scheduler
+        self.assertEqual(scheduler.execute_after.call_args[0][0], 0)
+        scheduler.execute_after.call_args[0][1]()
+        func.assert_called_once_with('arg')
+
+    def test_run_async(self):
+        async def handler():
+            return 'result'
+        self.bot.call_soon = Mock()
+        callback = Mock()
+        self.bot.run_async(handler(), callback)
+        for _ in range(100):
+            if self.bot.call_soon.called:
+                break
+            time.sleep(0.01)
+        self.bot.call_soon.assert_called_once_with(callback, 'result')
+
+    def test_send_msg_async(self):
+        async def handler():
+            return 'result'
+        coroutine = handler()
+        self.bot.run_async = Mock()
+        self.bot.send_msg(coroutine, True)
+        self.assertEqual(self.bot.run_async.call_args[0][0], coroutine)
+        self.bot.send_msg = Mock()
+        self.bot.run_async.call_args[0][1]('result')
+        self.bot.send_msg.assert_called_once_with('result', True)
+        coroutine.close()
 
     def test_send_msg_list(self):
         send_msg = self.bot.send_msg
@@ -377,11 +601,24 @@ class MinilodonTest(unittest.TestCase):
         _wrap_msg.return_value = 'wrapped'
         send_msg = self.bot.send_msg
         self.bot.send_msg = Mock()
-        longstr = ' '.join(itertools.repeat("Hello World!", 20))
+        longstr = ' '.join(itertools.repeat("Hello World!", 40))
         send_msg(longstr)
-        _wrap_msg.assert_called_once_with(longstr)
+        _wrap_msg.assert_called_once_with(longstr, 411)
         self.bot.send_msg.assert_called_once_with('wrapped', False)
 
+    def test_budget(self):
+        self.assertEqual(self.bot.budget('#channel', 'msg'), 411)
+        self.assertEqual(self.bot.budget('#channel', '/me msg'), 402)
+
+    def test_send_msg_multibyte(self):
+        self.bot.log = Mock()
+        self.bot.outbound.burst = 10
+        self.bot.outbound.tokens = 10
+        self.bot.send_msg('\u00e9' * 300)
+        lines = [call[0][1] for call in self.connection.privmsg.call_args_list]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(len(lines[0].encode('utf-8')), 410)
+
     def test_send_msg_action(self):
         self.bot.send_action = Mock()
         self.bot.send_msg('/me tests')
@@ -393,6 +630,21 @@ class MinilodonTest(unittest.TestCase):
         self.connection.privmsg.assert_called_once_with('#channel', 'Hello World!')
         self.bot.log.assert_called_once_with('#channel', '<nick> Hello World!')
 
+    def test_send_msg_control_shares_queue(self):
+        self.bot.log = Mock()
+        self.bot.reactor = Mock()
+        self.bot.outbound.tokens = 0
+        self.bot.outbound.updated = time.time()
+        for line in ['a', 'b']:
+            self.bot.send_msg(line, True)
+        self.bot.send_msg('main')
+        self.bot.outbound.tokens = 2
+        self.bot.outbound.updated = time.time()
+        self.bot.outbound.pump()
+        self.assertEqual([call[0] for call in
+                          self.connection.privmsg.call_args_list],
+                         [('#controlchannel', 'a'), ('#channel', 'main')])
+
     def test_send_priv_msg_list(self):
         send_priv_msg = self.bot.send_priv_msg
         self.bot.send_priv_msg = Mock()
@@ -405,9 +657,9 @@ class MinilodonTest(unittest.TestCase):
         _wrap_msg.return_value = 'wrapped'
         send_priv_msg = self.bot.send_priv_msg
         self.bot.send_priv_msg = Mock()
-        longstr = ' '.join(itertools.repeat("Hello World!", 20))
+        longstr = ' '.join(itertools.repeat("Hello World!", 40))
         send_priv_msg('target', longstr)
-        _wrap_msg.assert_called_once_with(longstr)
+        _wrap_msg.assert_called_once_with(longstr, 413)
         self.bot.send_priv_msg.assert_called_once_with('target', 'wrapped')
 
     def test_send_priv_msg_action(self):
@@ -438,17 +690,18 @@ class MinilodonTest(unittest.TestCase):
         self.assertEqual(function, result)
 
     def test_decorator_command(self):
-        self.bot.commands = {}
-        decorator = self.bot.command('command')
+        decorator = self.bot.command('command', aliases=['cmd'])
         function = Mock()
         result = decorator(function)
-        self.assertEqual(self.bot.commands, {'command': function})
+        self.assertEqual(self.bot.commands.handlers, {'command': function})
+        self.assertEqual(self.bot.commands['cmd'], function)
         self.assertEqual(function, result)
 
     def test_decorator_control_command(self):
-        self.bot.control_commands = {}
         decorator = self.bot.command('command', True)
         function = Mock()
         result = decorator(function)
-        self.assertEqual(self.bot.control_commands, {'command': function})
+        self.assertEqual(self.bot.control_commands.handlers,
+                         {'command': function})
+        self.assertEqual(len(self.bot.commands), 0)
         self.assertEqual(function, result)
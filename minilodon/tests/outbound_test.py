@@ -0,0 +1,98 @@
+import unittest
+from unittest.mock import Mock
+
+import irc.client
+from freezegun import freeze_time
+
+from minilodon.outbound import Outbound, HIGH
+
+class OutboundTest(unittest.TestCase):
+    def setUp(self):
+        self.bot = Mock()
+        self.connection = self.bot.connection
+        self.scheduler = self.bot.reactor.scheduler
+        with freeze_time('01-01-01 12:00:00'):
+            self.outbound = Outbound(self.bot, rate=1.0, burst=2, maxqueue=3)
+
+    def test_immediate(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.outbound.send('privmsg', ('#chan', 'a'), ('#chan', '<bot> a'))
+        self.connection.privmsg.assert_called_once_with('#chan', 'a')
+        self.bot.log.assert_called_once_with('#chan', '<bot> a')
+        self.assertFalse(self.scheduler.execute_after.called)
+
+    def test_queue(self):
+        with freeze_time('01-01-01 12:00:00'):
+            for line in ['a', 'b', 'c', 'd']:
+                self.outbound.send('privmsg', ('#chan', line))
+        self.assertEqual(self.connection.privmsg.call_count, 2)
+        self.assertEqual(len(self.outbound), 2)
+        self.scheduler.execute_after.assert_called_once_with(
+            1.0, self.outbound.pump)
+        with freeze_time('01-01-01 12:00:01'):
+            self.outbound.pump()
+        self.connection.privmsg.assert_called_with('#chan', 'c')
+        self.assertEqual(len(self.outbound), 1)
+        self.assertEqual(self.scheduler.execute_after.call_count, 2)
+
+    def test_coalesce(self):
+        with freeze_time('01-01-01 12:00:00'):
+            for line in ['a', 'b', 'c', 'c']:
+                self.outbound.send('privmsg', ('#chan', line))
+        self.assertEqual(len(self.outbound), 1)
+        self.assertEqual(self.outbound.coalesced, 1)
+
+    def test_priority(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.outbound.tokens = 0
+            self.outbound.send('privmsg', ('#chan', 'chatter'))
+            self.outbound.send('kick', ('#chan', 'nick', 'reason'),
+                               priority=HIGH)
+        with freeze_time('01-01-01 12:00:01'):
+            self.outbound.pump()
+        self.connection.kick.assert_called_once_with('#chan', 'nick', 'reason')
+        self.assertFalse(self.connection.privmsg.called)
+
+    def test_round_robin(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.outbound.tokens = 0
+            self.outbound.send('privmsg', ('a', '1'))
+            self.outbound.send('privmsg', ('a', '2'))
+            self.outbound.send('privmsg', ('b', '1'))
+        with freeze_time('01-01-01 12:00:02'):
+            self.outbound.pump()
+        self.assertEqual([call[0] for call in
+                          self.connection.privmsg.call_args_list],
+                         [('a', '1'), ('b', '1')])
+
+    def test_maxqueue(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.outbound.tokens = 0
+            for line in ['1', '2', '3', '4', '5']:
+                self.outbound.send('privmsg', ('a', line))
+            self.outbound.send('privmsg', ('b', '1'))
+        self.assertEqual(len(self.outbound), 4)
+        self.assertEqual(self.outbound.dropped, 2)
+        with freeze_time('01-01-01 12:00:02'):
+            self.outbound.pump()
+        with freeze_time('01-01-01 12:00:04'):
+            self.outbound.pump()
+        self.assertEqual([call[0] for call in
+                          self.connection.privmsg.call_args_list],
+                         [('a', 'Dropped 2 queued lines.'), ('b', '1'),
+                          ('a', '3'), ('a', '4')])
+
+    def test_maxqueue_high(self):
+        with freeze_time('01-01-01 12:00:00'):
+            self.outbound.tokens = 0
+            for nick in 'abcde':
+                self.outbound.send('kick', ('#chan', nick, 'reason'),
+                                   priority=HIGH)
+        self.assertEqual(len(self.outbound), 5)
+        self.assertEqual(self.outbound.dropped, 0)
+
+    def test_not_connected(self):
+        self.bot.connection.privmsg.side_effect = \
+            irc.client.ServerNotConnectedError()
+        self.outbound.send('privmsg', ('#channel', 'msg'), ('#channel', 'log'))
+        self.assertFalse(self.bot.log.called)
@@ -0,0 +1,66 @@
+import unittest
+from threading import Event
+from unittest.mock import Mock
+
+from minilodon.preview import Previewer
+
+class PreviewerTest(unittest.TestCase):
+    def setUp(self):
+        self.fetch = Mock(return_value='result')
+        self.previewer = Previewer(self.fetch, workers=1, maxqueue=2,
+                                   timeout=10.0)
+        self.previewer.start = Mock()
+
+    def test_submit(self):
+        callback = Mock()
+        self.previewer.submit('url', callback)
+        self.previewer.start.assert_called_once_with()
+        self.assertEqual(len(self.previewer.requests), 1)
+
+    def test_drop_oldest(self):
+        self.previewer.threads = ['thread']
+        for url in ['a', 'b', 'c']:
+            self.previewer.submit(url, Mock())
+        urls = [request[0] for request in self.previewer.requests]
+        self.assertEqual(urls, ['b', 'c'])
+        self.assertEqual(self.previewer.dropped, 1)
+
+    def test_submit_all(self):
+        self.previewer.maxqueue = 8
+        self.previewer.submit_all(['a', 'b'], Mock())
+        self.previewer.start.assert_called_once_with()
+        urls = [request[0] for request in self.previewer.requests]
+        self.assertEqual(urls, ['a', 'b'])
+
+    def test_run(self):
+        callback = Mock()
+        self.previewer.run('url', callback, 1e12)
+        self.fetch.assert_called_once_with('url')
+        callback.assert_called_once_with('result')
+
+    def test_run_none(self):
+        callback = Mock()
+        self.fetch.return_value = None
+        self.previewer.run('url', callback, 1e12)
+        self.assertFalse(callback.called)
+
+    def test_run_expired(self):
+        callback = Mock()
+        self.previewer.run('url', callback, 0)
+        self.assertFalse(self.fetch.called)
+        self.assertEqual(self.previewer.expired, 1)
+
+    def test_run_error(self):
+        callback = Mock()
+        self.fetch.side_effect = ValueError()
+        self.previewer.logger = Mock()
+        self.previewer.run('url', callback, 1e12)
+        self.assertFalse(callback.called)
+        self.assertTrue(self.previewer.logger.exception.called)
+
+    def test_workers(self):
+        done = Event()
+        previewer = Previewer(self.fetch, workers=2)
+        previewer.submit('url', lambda result: done.set())
+        self.assertTrue(done.wait(5))
+        self.assertEqual(len(previewer.threads), 2)
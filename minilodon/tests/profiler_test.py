@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+
+from minilodon.profiler import Profiler, size
+
+class ProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler(threshold=0.1)
+
+    def test_disabled(self):
+        func = Mock(return_value='result')
+        self.profiler.logger = Mock()
+        self.assertEqual(self.profiler.run('pubmsg', 3, func, 'a'), 'result')
+        func.assert_called_once_with('a')
+        self.assertEqual(self.profiler.slowest, [])
+
+    @patch('time.perf_counter', Mock(side_effect=[0.0, 0.5]))
+    def test_slow(self):
+        self.profiler.enabled = True
+        self.profiler.logger = Mock()
+        self.profiler.run('namreply', 42, Mock())
+        self.profiler.logger.warning.assert_called_once_with(
+            "Slow %s took %.3fs (%d bytes)", 'namreply', 0.5, 42)
+
+    @patch('time.perf_counter', Mock(side_effect=[0.0, 0.01]))
+    def test_fast(self):
+        self.profiler.enabled = True
+        self.profiler.logger = Mock()
+        self.profiler.run('pubmsg', 3, Mock())
+        self.assertFalse(self.profiler.logger.warning.called)
+
+    def test_exception(self):
+        self.profiler.enabled = True
+        with self.assertRaises(ValueError):
+            self.profiler.run('pubmsg', 3, Mock(side_effect=ValueError))
+
+    def test_samples(self):
+        self.profiler.enabled = True
+        self.profiler.samples = 2
+        self.profiler.threshold = 10.0
+        for duration in [0.3, 0.1, 0.2]:
+            with patch('time.perf_counter',
+                       Mock(side_effect=[0.0, duration])):
+                self.profiler.run('e{}'.format(duration), 0, sum, [1, 2])
+        self.assertEqual(self.profiler.report(), ['e0.3 0.300s',
+                                                  'e0.2 0.200s'])
+        self.assertFalse(self.profiler.profiling)
+
+    def test_nested(self):
+        self.profiler.enabled = True
+        self.profiler.samples = 1
+        inner = lambda: self.profiler.run('inner', 0, sum, [1])
+        self.assertEqual(self.profiler.run('outer', 0, inner), 1)
+        self.assertEqual(len(self.profiler.slowest), 1)
+        self.assertEqual(self.profiler.slowest[0][2], 'outer')
+
+    def test_dump(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, 'minilodon.prof')
+            self.assertFalse(self.profiler.dump(filename))
+            self.profiler.enabled = True
+            self.profiler.samples = 1
+            self.profiler.run('pubmsg', 0, sum, [1, 2])
+            self.assertTrue(self.profiler.dump(filename))
+            self.assertTrue(os.path.exists(filename))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_reset(self):
+        self.profiler.slowest = ['sample']
+        self.profiler.reset()
+        self.assertEqual(self.profiler.slowest, [])
+
+    def test_size(self):
+        self.assertEqual(size(['ab', 'cde', None]), 5)
@@ -0,0 +1,55 @@
+import unittest
+
+from minilodon.roster import Roster
+
+class RosterTest(unittest.TestCase):
+    def setUp(self):
+        self.roster = Roster('Minilodon')
+
+    def test_add(self):
+        self.roster.add('User')
+        self.roster.add('user')
+        self.roster.add('ChanServ')
+        self.roster.add('minilodon')
+        self.assertIn('USER', self.roster)
+        self.assertEqual(len(self.roster), 3)
+        self.assertEqual(self.roster.count, 1)
+        self.assertEqual(self.roster.alone(), 'user')
+
+    def test_remove(self):
+        self.roster.add('user1')
+        self.roster.add('user2')
+        self.assertEqual(self.roster.alone(), '')
+        self.roster.remove('USER2')
+        self.roster.remove('user3')
+        self.assertEqual(self.roster.count, 1)
+        self.assertEqual(self.roster.alone(), 'user1')
+
+    def test_rename(self):
+        self.roster.add('user1')
+        self.roster.rename('user1', 'user2')
+        self.assertNotIn('user1', self.roster)
+        self.assertIn('user2', self.roster)
+        self.roster.rename('user3', 'user4')
+        self.assertNotIn('user4', self.roster)
+        self.assertEqual(self.roster.count, 1)
+
+    def test_rename_self(self):
+        self.roster.add('Minilodon')
+        self.roster.add('user')
+        self.roster.rename('Minilodon', 'Minilodon_')
+        self.assertTrue(self.roster.is_ignored('minilodon_'))
+        self.assertEqual(self.roster.count, 1)
+
+    def test_setnick(self):
+        self.roster.add('Minilodon_')
+        self.assertEqual(self.roster.count, 1)
+        self.roster.setnick('Minilodon_')
+        self.assertEqual(self.roster.count, 0)
+        self.assertFalse(self.roster.is_ignored('minilodon'))
+
+    def test_clear(self):
+        self.roster.add('user')
+        self.roster.clear()
+        self.assertEqual(len(self.roster), 0)
+        self.assertEqual(self.roster.count, 0)
@@ -0,0 +1,85 @@
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from unittest.mock import Mock
+
+from minilodon.logwriter import LogWriter
+from minilodon.rotation import Rotator
+
+class RotatorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.dir, '#test'))
+        self.rotator = Rotator(self.dir, keepraw=2, keepcompressed=3)
+        self.today = date(2001, 1, 10)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, '#test', name)
+
+    def create(self, name, data=b'01-01-01 12:00:00 <nick> msg\n'):
+        with open(self.path(name), 'wb') as logfile:
+            logfile.write(data)
+
+    def test_keep_raw(self):
+        self.create('01-01-08-#test.log')
+        self.rotator.sweep('#test', self.today)
+        self.assertTrue(os.path.exists(self.path('01-01-08-#test.log')))
+
+    def test_compress(self):
+        self.create('01-01-07-#test.log')
+        self.rotator.sweep('#test', self.today)
+        self.assertFalse(os.path.exists(self.path('01-01-07-#test.log')))
+        with gzip.open(self.path('01-01-07-#test.log.gz')) as gzfile:
+            self.assertEqual(gzfile.read(), b'01-01-01 12:00:00 <nick> msg\n')
+
+    def test_expire(self):
+        self.create('01-01-05-#test.log.gz')
+        self.create('01-01-05-#test.log.idx')
+        self.create('01-01-04-#test.log.gz')
+        self.create('01-01-04-#test.log.idx')
+        self.rotator.sweep('#test', self.today)
+        self.assertTrue(os.path.exists(self.path('01-01-05-#test.log.gz')))
+        self.assertFalse(os.path.exists(self.path('01-01-04-#test.log.gz')))
+        self.assertFalse(os.path.exists(self.path('01-01-04-#test.log.idx')))
+
+    def test_keep_compressed(self):
+        self.rotator.keepcompressed = None
+        self.create('01-01-01-#test.log.gz')
+        self.rotator.sweep('#test', self.today)
+        self.assertTrue(os.path.exists(self.path('01-01-01-#test.log.gz')))
+
+    def test_ignore(self):
+        self.create('notes.txt')
+        self.create('01-01-01-#test.log.gz.tmp')
+        self.rotator.sweep('#test', self.today)
+        self.assertEqual(os.listdir(os.path.join(self.dir, '#test')),
+                         ['notes.txt'])
+
+    def test_thread(self):
+        self.create('01-01-01-#test.log')
+        self.rotator.start()
+        self.rotator.rotate_all()
+        self.rotator.stop()
+        self.assertTrue(os.path.exists(self.path('01-01-01-#test.log.gz')))
+
+    def test_rotate_all_missing(self):
+        rotator = Rotator(os.path.join(self.dir, 'missing'))
+        rotator.rotate_all()
+        self.assertTrue(rotator.queue.empty())
+
+    def test_logwriter(self):
+        rotator = Mock()
+        writer = LogWriter(directory=self.dir, rotator=rotator)
+        writer.handle(('write', '#test',
+                       datetime(2001, 1, 1, 12).timestamp(), 'a'))
+        self.assertFalse(rotator.rotate.called)
+        writer.handle(('write', '#test',
+                       datetime(2001, 1, 2, 12).timestamp(), 'b'))
+        rotator.rotate.assert_called_once_with('#test')
+        writer.shutdown()
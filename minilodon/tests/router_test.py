@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import Mock
+
+from minilodon.router import CommandRouter
+
+class CommandRouterTest(unittest.TestCase):
+    def setUp(self):
+        self.router = CommandRouter()
+        self.list = Mock(return_value='list')
+        self.lookup = Mock(return_value='lookup')
+        self.router.add('list', self.list, ['ls'])
+        self.router['lookup'] = self.lookup
+
+    def test_mapping(self):
+        self.assertIn('list', self.router)
+        self.assertIn('ls', self.router)
+        self.assertNotIn('li', self.router)
+        self.assertEqual(self.router['ls'], self.list)
+        self.assertEqual(sorted(self.router), ['list', 'lookup'])
+
+    def test_dispatch(self):
+        result = self.router.dispatch('nick', 'list category')
+        self.list.assert_called_once_with('nick', ['list', 'category'])
+        self.assertEqual(result, 'list')
+
+    def test_alias(self):
+        self.router.dispatch('nick', 'ls')
+        self.list.assert_called_once_with('nick', ['ls'])
+
+    def test_prefix(self):
+        self.assertEqual(self.router.resolve('lo'), 'lookup')
+        self.assertEqual(self.router.resolve('lis'), 'list')
+        self.assertIsNone(self.router.resolve('l'))
+        self.assertIsNone(self.router.resolve('x'))
+        self.assertIsNone(self.router.resolve(''))
+
+    def test_alias_prefix(self):
+        router = CommandRouter()
+        router.add('spy', Mock(), ['spion'])
+        self.assertEqual(router.resolve('sp'), 'spy')
+
+    def test_unknown(self):
+        self.assertIsNone(self.router.dispatch('nick', 'unknown arg'))
+        self.assertFalse(self.list.called)
+
+    def test_cache(self):
+        self.assertEqual(self.router.resolve('lo'), 'lookup')
+        self.assertEqual(self.router.cache['lo'], 'lookup')
+        self.router['long'] = Mock()
+        self.assertEqual(self.router.cache, {})
+        self.assertIsNone(self.router.resolve('lo'))
+
+    def test_cache_size(self):
+        self.router.cachesize = 2
+        for token in ['a', 'b', 'c']:
+            self.router.resolve(token)
+        self.assertEqual(list(self.router.cache), ['c'])
+
+    def test_stats(self):
+        self.router.dispatch('nick', 'list')
+        self.router.dispatch('nick', 'list')
+        self.assertEqual(self.router.stats['list'][0], 2)
+        self.assertNotIn('lookup', self.router.stats)
@@ -0,0 +1,50 @@
+import unittest
+
+from freezegun import freeze_time
+
+from minilodon.urls import URLScanner
+
+class URLScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.scanner = URLScanner(window=60.0)
+
+    def test_no_url(self):
+        self.assertEqual(self.scanner.scan('Hello World!'), [])
+        self.assertEqual(self.scanner.scan('gopher://example.com'), [])
+
+    def test_anywhere(self):
+        result = self.scanner.scan('look (https://example.com/a?b=c), ok')
+        self.assertEqual(result, ['https://example.com/a?b=c'])
+
+    def test_brackets(self):
+        result = self.scanner.scan('see https://en.wikipedia.org/wiki/'
+                                   'Foo_(bar) and (https://example.com/'
+                                   'Baz_(qux)).')
+        self.assertEqual(result, ['https://en.wikipedia.org/wiki/Foo_(bar)',
+                                  'https://example.com/Baz_(qux)'])
+
+    def test_multiple(self):
+        result = self.scanner.scan('http://a.example http://b.example')
+        self.assertEqual(result, ['http://a.example', 'http://b.example'])
+
+    def test_duplicate_in_message(self):
+        result = self.scanner.scan('https://youtu.be/abc and '
+                                   'https://www.youtube.com/watch?v=abc')
+        self.assertEqual(result, ['https://youtu.be/abc'])
+
+    def test_window(self):
+        with freeze_time("2016-01-01 12:00:00"):
+            self.assertEqual(self.scanner.scan('http://a.example'),
+                             ['http://a.example'])
+        with freeze_time("2016-01-01 12:00:30"):
+            self.assertEqual(self.scanner.scan('http://a.example'), [])
+        with freeze_time("2016-01-01 12:01:01"):
+            self.assertEqual(self.scanner.scan('http://a.example'),
+                             ['http://a.example'])
+
+    def test_maxsize(self):
+        self.scanner.maxsize = 2
+        self.scanner.scan('http://a.example http://b.example http://c.example')
+        self.assertEqual(len(self.scanner.recent), 2)
+        self.assertEqual(self.scanner.scan('http://a.example'),
+                         ['http://a.example'])
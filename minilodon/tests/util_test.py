@@ -20,12 +20,20 @@ class UtilTest(unittest.TestCase):
 
     @patch('builtins.open')
     @patch('os.path.exists')
-    @patch('os.mkdir')
+    @patch('os.makedirs')
     def test_open_mkdir(self, _mkdir, _exists, _open):
         _exists.return_value = False
         util.open_log_file('#test')
         _mkdir.assert_called_once_with('#test')
 
+    @patch('builtins.open')
+    @patch('os.path.exists')
+    def test_open_directory(self, _exists, _open):
+        _exists.return_value = True
+        util.open_log_file('#test', directory='net')
+        _exists.assert_called_with('net/#test')
+        self.assertTrue(_open.call_args[0][0].startswith('net/#test/'))
+
     def test_wrap_short(self):
         result = list(util.wrap_msg('Hello World!'))
         self.assertEqual(len(result), 1)
@@ -36,3 +44,26 @@ class UtilTest(unittest.TestCase):
         result = list(util.wrap_msg(teststr))
         self.assertEqual(len(result), 2)
         self.assertEqual(result[1], 'World! Hello World!')
+
+    def test_wrap_budget(self):
+        result = list(util.wrap_msg('aaa bbb ccc', 7))
+        self.assertEqual(result, ['aaa bbb', 'ccc'])
+
+    def test_wrap_multibyte(self):
+        result = list(util.wrap_msg('\u00e9\u00e9\u00e9 \u00e9', 6))
+        self.assertEqual(result, ['\u00e9\u00e9\u00e9', '\u00e9'])
+
+    def test_wrap_hard_split(self):
+        result = list(util.wrap_msg('ab \u20ac\u20ac\u20ac cd', 4))
+        self.assertEqual(result, ['ab', '\u20ac', '\u20ac', '\u20ac', 'cd'])
+        for line in result:
+            self.assertLessEqual(len(line.encode('utf-8')), 4)
+
+    def test_wrap_no_recursion(self):
+        result = list(util.wrap_msg('word ' * 100000, 10))
+        self.assertEqual(len(result), 50000)
+
+    def test_payload_budget(self):
+        header = ':nick!' + 'u' * 10 + '@' + 'h' * 63 + ' PRIVMSG #test :'
+        self.assertEqual(util.payload_budget('#test', 'nick'),
+                         510 - len(header))
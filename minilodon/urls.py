@@ -0,0 +1,54 @@
+from collections import OrderedDict
+import re
+import time
+
+from minilodon.cache import normalize_url
+
+URL_REGEX = re.compile(r"https?://[^\s<>\"']+", re.IGNORECASE)
+TRAILING = ".,;:!?)]}>'\""
+BRACKETS = {')': '(', ']': '[', '}': '{'}
+
+def strip_trailing(url):
+    '''Strips punctuation after a link, keeping brackets opened inside it.'''
+    while url and url[-1] in TRAILING:
+        opening = BRACKETS.get(url[-1])
+        if opening is not None and url.count(opening) >= url.count(url[-1]):
+            break
+        url = url[:-1]
+    return url
+
+class URLScanner(object):
+    '''Finds the http(s) links in a line that have not been seen recently.
+
+    Links are compared by their normalized form, so the same video pasted as
+    a youtu.be and a youtube.com link within `window` seconds is only
+    previewed once.
+    '''
+    def __init__(self, window=60.0, maxsize=256):
+        self.window = window
+        self.maxsize = maxsize
+        self.recent = OrderedDict()
+
+    def scan(self, msg):
+        if "://" not in msg:
+            return []
+        curtime = time.time()
+        self.expire(curtime)
+        urls = []
+        for match in URL_REGEX.finditer(msg):
+            url = strip_trailing(match.group())
+            key = normalize_url(url)
+            if key in self.recent:
+                continue
+            self.recent[key] = curtime
+            urls.append(url)
+        while len(self.recent) > self.maxsize:
+            self.recent.popitem(last=False)
+        return urls
+
+    def expire(self, curtime):
+        while self.recent:
+            key, seen = next(iter(self.recent.items()))
+            if seen + self.window > curtime:
+                return
+            del self.recent[key]
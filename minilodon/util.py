@@ -1,31 +1,78 @@
 from datetime import datetime
+import gzip
 import os
 
-def open_log_file(channel):
-    if not os.path.exists(channel):
-        os.mkdir(channel)
-    curdate = datetime.now()
+def open_log_file(channel, buffering=1, curdate=None, directory=''):
+    path = os.path.join(directory, channel)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    if curdate is None:
+        curdate = datetime.now()
     datestr = curdate.strftime('%y-%m-%d')
-    filename = '{}/{}-{}.log'.format(channel, datestr, channel)
-    logfile = open(filename, 'at', 1)
+    filename = '{}/{}-{}.log'.format(path, datestr, channel)
+    logfile = open(filename, 'at', buffering)
     logfile.day = curdate.day
     return logfile
 
-def wrap_msg(words):
-    if isinstance(words, str):
-        for line in wrap_msg(words.split(' ')):
-            yield line
-        return
-    line = ''
-    index = 0
-    for i in range(len(words)):
-        newline = line + ' ' + words[i]
-        if len(newline) > 254:
-            index = i
-            break
-        line = newline
-    yield line.strip()
-    if index > 0:
-        remainder = words[index:]
-        for line in wrap_msg(remainder):
-            yield line
+USERLEN = 10
+HOSTLEN = 63
+
+def open_log_reader(filename):
+    '''Opens a daily log for reading in binary mode, even once compressed.'''
+    try:
+        return open(filename, 'rb')
+    except FileNotFoundError:
+        pass
+    try:
+        return gzip.open(filename + '.gz', 'rb')
+    except FileNotFoundError:
+        return None
+
+def write_atomic(filename, data):
+    tmpname = filename + '.tmp'
+    with open(tmpname, 'w') as tmpfile:
+        tmpfile.write(data)
+        tmpfile.flush()
+        os.fsync(tmpfile.fileno())
+    os.replace(tmpname, filename)
+
+def payload_budget(target, nick):
+    '''Bytes left for the text of a PRIVMSG to target.
+
+    Servers relay our messages with a ':nick!user@host' prefix and the whole
+    line may not exceed 512 bytes including CRLF. The real user and host are
+    not known, so the longest common values are assumed.
+    '''
+    header = ":{}!{}@{} PRIVMSG {} :".format(nick, 'u' * USERLEN,
+                                              'h' * HOSTLEN, target)
+    return 510 - len(header.encode('utf-8'))
+
+def wrap_msg(msg, budget=254):
+    '''Split msg into lines of at most budget bytes when encoded as UTF-8.
+
+    Lines break between words where possible; words longer than a line are
+    split, but never inside a multibyte character.
+    '''
+    line = []
+    size = 0
+    for word in msg.split(' '):
+        data = word.encode('utf-8')
+        while len(data) > budget:
+            if line:
+                yield ' '.join(line)
+                line = []
+                size = 0
+            cut = budget
+            while cut > 0 and data[cut] & 0xC0 == 0x80:
+                cut -= 1
+            yield data[:cut].decode('utf-8')
+            data = data[cut:]
+            word = data.decode('utf-8')
+        if line and size + 1 + len(data) > budget:
+            yield ' '.join(line)
+            line = []
+            size = 0
+        size += len(data) + (1 if line else 0)
+        line.append(word)
+    if line:
+        yield ' '.join(line)